@@ -1,24 +1,28 @@
 import os
 import time
-import requests
 import asyncio
-import aiohttp
 from models.agent import AgentBaseModel
-from dotenv import load_dotenv
+from utils.http import SessionPool, client_timeout
+from utils.tracing import tracer
+from utils.passages import select_passages
+from utils.config import load_config
 from agent_framework import ai_function
-from typing import Annotated
+from typing import Annotated, Optional
 from pydantic import Field
 
-load_dotenv()
+load_config()
 
-AIMA_URL = os.environ["AIMA_URL"]
-AIMA_INSTRUCTION = os.environ["AIMA_INSTRUCTION"]
+AIMA_CONTEXT_TOKENS = int(os.environ.get("AIMA_CONTEXT_TOKENS", "1500"))
+AIMA_MAX_PASSAGES = int(os.environ.get("AIMA_MAX_PASSAGES", "5"))
+AIMA_DEDUP_THRESHOLD = float(os.environ.get("AIMA_DEDUP_THRESHOLD", "0.8"))
 
 class Aima(AgentBaseModel):    
-    def __init__(self):
+    def __init__(self, http: Optional[SessionPool] = None):
+        self.url = os.environ["AIMA_URL"]
         super().__init__(
-            instruction=AIMA_INSTRUCTION,
-            tools=[self.ask]
+            instruction=os.environ["AIMA_INSTRUCTION"],
+            tools=[self.ask],
+            http=http
         )
     
     @ai_function(name="ask", description="Asks user's query to AIMA and returns response")
@@ -29,7 +33,10 @@ class Aima(AgentBaseModel):
         try:
             print("[WARNING] You are using v1, switch to the newest method for faster results.")
 
-            url = AIMA_URL
+            # Only this legacy path needs requests
+            import requests
+
+            url = self.url
             
             payload = {
                 "messages": [
@@ -48,13 +55,7 @@ class Aima(AgentBaseModel):
             end_time = time.time()     
             elapsed = end_time - start_time
 
-            if "context" in data and "data_points" in data["context"]:
-                text_data = data["context"]["data_points"].get("text", [])
-                if text_data:
-                    response_text = "\n".join(text_data[:1])
-
-            if not response_text:
-                response_text = str(data)
+            response_text = self.extract(message, data)
             
             # Calculate response length
             response_length = len(response_text)
@@ -66,53 +67,57 @@ class Aima(AgentBaseModel):
         except Exception as e:
             return f"Error accessing AIMA: {e}"
         
+    async def fetch(self, message: str) -> str:
+        payload = {
+            "messages": [
+                {"role": "user", "content": message}
+            ]
+        }
+
+        with tracer.span("aima.request", backend=self.name) as span:
+            session = await self.session()
+            async with session.post(
+                self.url,
+                json=payload,
+                timeout=client_timeout(40)
+            ) as resp:
+                resp.raise_for_status()
+                data = await resp.json()
+
+            response_text = self.extract(message, data)
+            span.set(length=len(response_text))
+
+        return response_text
+
+    def extract(self, message: str, data: dict) -> str:
+        """
+        Context for the agent LLM from an AIMA response
+
+        The returned data points are ranked against `message` and the best,
+        deduplicated ones packed into AIMA_CONTEXT_TOKENS (see
+        `select_passages`); a response without data points is passed on
+        raw, cut to the same budget.
+        """
+        text_data = []
+        if isinstance(data.get("context"), dict) and isinstance(data["context"].get("data_points"), dict):
+            text_data = data["context"]["data_points"].get("text") or []
+
+        passages = select_passages(
+            message, text_data,
+            budget=AIMA_CONTEXT_TOKENS,
+            max_passages=AIMA_MAX_PASSAGES,
+            dedup_threshold=AIMA_DEDUP_THRESHOLD,
+        )
+        if passages:
+            return "\n\n".join(passages)
+        return str(data)[:AIMA_CONTEXT_TOKENS * 4]
+
     @ai_function(name="ask", description="Asks user's query to AIMA and returns response")
     async def ask(
         self,
         message: Annotated[str, Field(description="Pesan user untuk dikirim ke AIMA Chatbot API.")]
     ) -> str:
-        try:
-            payload = {
-                "messages": [
-                    {"role": "user", "content": message}
-                ]
-            }
-
-            # @@@
-            start_time = time.time()
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    AIMA_URL,
-                    json=payload,
-                    timeout=aiohttp.ClientTimeout(total=40)
-                ) as resp:
-                    resp.raise_for_status()
-                    data = await resp.json()
-
-            # @@@
-            end_time = time.time()     
-            elapsed = end_time - start_time
-
-            # Extract response
-            response_text = ""
-            if "context" in data and "data_points" in data["context"]:
-                text_data = data["context"]["data_points"].get("text", [])
-                if text_data:
-                    response_text = "\n".join(text_data[:1])
-            
-            if not response_text:
-                response_text = str(data)
-            
-            # Calculate response length
-            response_length = len(response_text)
-            
-            print(f"[AIMA TOOL] Response time: {elapsed:.3f} sec | Length: {response_length} chars\n")
-
-            return response_text
-
-        except Exception as e:
-            return f"Error accessing AIMA: {e}"
+        return await self.answer(message)
 
 if __name__ == "__main__":
     async def main():
@@ -123,14 +128,12 @@ if __name__ == "__main__":
         query = "Jenis kargo apa saja yang diangkut oleh PT Pertamina Trans Kontinental?"
         print("User:", query)
 
-        # @@@
-        start_time = time.time()
-
-        await agent.stream(query)
+        try:
+            with tracer.span("agent.stream", agent=agent.name):
+                await agent.stream(query)
+        finally:
+            await agent.close()
 
-        # @@@
-        end_time = time.time()     
-        elapsed = end_time - start_time
-        print(f"\n\n[AIMA STREAM] Total response time: {elapsed:.3f} sec\n")
+        print("\n\n" + tracer.report() + "\n")
 
     asyncio.run(main())
\ No newline at end of file
@@ -1,28 +1,18 @@
 import os
 import time
-import requests
 import asyncio
-import aiohttp
-from models.agent import AgentBaseModel
-from dotenv import load_dotenv
+from agents.directline import DirectLineAgent
+from utils.tracing import tracer
+from utils.config import load_config
 from agent_framework import ai_function
 from typing import Annotated
 from pydantic import Field
 
-load_dotenv()
+load_config()
 
-DIFA_SECRET = os.environ["DIFA_SECRET"]
-DIFA_TOKEN_URL = os.environ["DIFA_TOKEN_URL"]
-DIFA_URL = os.environ["DIFA_URL"]
-DIFA_INSTRUCTION = os.environ["DIFA_INSTRUCTION"]
+class Difa(DirectLineAgent):
+    prefix = "DIFA"
 
-class Difa(AgentBaseModel):    
-    def __init__(self):
-        super().__init__(
-            instruction=DIFA_INSTRUCTION,
-            tools=[self.ask]
-        )
-    
     @ai_function(name="ask", description="Asks user's query to DIFA and returns response")
     async def ask_v1(
         self,
@@ -31,13 +21,20 @@ class Difa(AgentBaseModel):
         try:
             print("[WARNING] You are using v1, switch to the newest method for faster results.")
 
+            # Only this legacy path needs requests and reads the settings directly
+            import requests
+
+            secret = os.environ["DIFA_SECRET"]
+            token_url = os.environ["DIFA_TOKEN_URL"]
+            url = os.environ["DIFA_URL"]
+
             # @@@
             start_time = time.time()
 
             token_res = requests.get(
-                DIFA_TOKEN_URL,
+                token_url,
                 headers={
-                    "Authorization": f"Bearer {DIFA_SECRET}",
+                    "Authorization": f"Bearer {secret}",
                     "Content-Type": "application/json"
                 }
             ).json()
@@ -49,7 +46,7 @@ class Difa(AgentBaseModel):
             directline_token = token_res["token"]
 
             conv_res = requests.post(
-                DIFA_URL,
+                url,
                 headers={
                     "Authorization": f"Bearer {directline_token}",
                     "Content-Type": "application/json"
@@ -63,7 +60,7 @@ class Difa(AgentBaseModel):
             conv_id = conv_res["conversationId"]
 
             requests.post(
-                DIFA_URL + f'/{conv_id}/activities',
+                url + f'/{conv_id}/activities',
                 headers={
                     "Authorization": f"Bearer {directline_token}",
                     "Content-Type": "application/json"
@@ -82,7 +79,7 @@ class Difa(AgentBaseModel):
             for _ in range(20):
                 time.sleep(15)
                 data = requests.get(
-                    DIFA_URL + f'/{conv_id}/activities',
+                    url + f'/{conv_id}/activities',
                     headers={"Authorization": f"Bearer {directline_token}"}
                 ).json()
 
@@ -108,100 +105,7 @@ class Difa(AgentBaseModel):
         self,
         message: Annotated[str, Field(description="Pesan user untuk dikirim ke DIFA Chatbot API.")]
     ) -> str:
-        try:
-            # @@@
-            start_time = time.time()
-
-            async with aiohttp.ClientSession() as session:
-                # 1. Get token
-                async with session.get(
-                    DIFA_TOKEN_URL,
-                    headers={
-                        "Authorization": f"Bearer {DIFA_SECRET}",
-                        "Content-Type": "application/json"
-                    }
-                ) as resp:
-                    token_res = await resp.json()
-                
-                # @@@
-                token_time = time.time()
-                print(f"[DIFA TOOL - TOKEN] Response time: {(token_time - start_time):.3f} sec")
-
-                directline_token = token_res["token"]
-
-                # 2. Create conversation
-                async with session.post(
-                    DIFA_URL,
-                    headers={
-                        "Authorization": f"Bearer {directline_token}",
-                        "Content-Type": "application/json"
-                    }
-                ) as resp:
-                    conv_res = await resp.json()
-                
-                # @@@
-                conv_id_time = time.time()
-                print(f"[DIFA TOOL - CONV_ID] Response time: {(conv_id_time - token_time):.3f} sec")
-
-                conv_id = conv_res["conversationId"]
-
-                # 3. Send message
-                async with session.post(
-                    DIFA_URL + f'/{conv_id}/activities',
-                    headers={
-                        "Authorization": f"Bearer {directline_token}",
-                        "Content-Type": "application/json"
-                    },
-                    json={
-                        "type": "message",
-                        "from": {"id": "azure-agent"},
-                        "text": message
-                    }
-                ) as resp:
-                    await resp.read()
-                
-                # @@@
-                post_time = time.time()
-                print(f"[DIFA TOOL - POST] Response time: {(post_time - conv_id_time):.3f} sec")
-
-                poll_intervals = [2, 3, 5, 7, 10, 15]
-                max_attempts = 20
-                
-                for attempt in range(max_attempts):
-                    if attempt < len(poll_intervals):
-                        delay = poll_intervals[attempt]
-                    else:
-                        delay = 15
-                    
-                    await asyncio.sleep(delay)
-                    
-                    async with session.get(
-                        DIFA_URL + f'/{conv_id}/activities',
-                        headers={"Authorization": f"Bearer {directline_token}"}
-                    ) as resp:
-                        data = await resp.json()
-                    
-                    # @@@
-                    elapsed = time.time() - start_time
-                    print(f"[DIFA TOOL - Poll #{attempt+1}] Elapsed: {elapsed:.3f} sec")
-
-                    activities = data.get("activities", [])
-                    if len(activities) > 1:
-                        bot_messages = [a["text"] for a in activities if a["from"]["id"] != "azure-agent"]
-                        if bot_messages:
-                            response_text = bot_messages[-1]
-
-                            # @@@
-                            response_length = len(response_text)
-                            get_time = time.time()
-                            print(f"[DIFA TOOL - GET] Response time: {(get_time - start_time):.3f} sec | Length: {response_length} chars\n")
-                            
-                            return response_text
-
-                return "DIFA tidak merespons dalam waktu yang ditentukan."
-
-        except Exception as e:
-            return f"Error accessing DIFA: {e}"
+        return await self.answer(message)
 
 if __name__ == "__main__":
     async def main():
@@ -212,14 +116,12 @@ if __name__ == "__main__":
         query = "Siapa saja yang tergabung dalam usecase Jargas?"
         print("User:", query)
 
-        # @@@
-        start_time = time.time()
-
-        await agent.stream(query)
+        try:
+            with tracer.span("agent.stream", agent=agent.name):
+                await agent.stream(query)
+        finally:
+            await agent.close()
 
-        # @@@
-        end_time = time.time()     
-        elapsed = end_time - start_time
-        print(f"\n\n[DIFA STREAM] Total response time: {elapsed:.3f} sec\n")
+        print("\n\n" + tracer.report() + "\n")
 
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,70 @@
+import os
+from typing import Annotated, AsyncIterator, Optional
+from pydantic import Field
+from agent_framework import ai_function
+from models.agent import AgentBaseModel
+from utils.directline import DirectLineBackend
+from utils.http import SessionPool
+from utils.session import current_session
+from utils.streaming import progressive
+from utils.config import load_config
+
+load_config()
+
+class DirectLineAgent(AgentBaseModel):
+    """
+    Agent backed by a DirectLine bot, configured entirely from environment
+    variables with the given prefix (`<PREFIX>_SECRET`, `<PREFIX>_TOKEN_URL`,
+    `<PREFIX>_URL`, `<PREFIX>_INSTRUCTION` and optionally `<PREFIX>_TRANSPORT`).
+    """
+
+    prefix: str = ""
+    stateful = True
+
+    def __init__(
+        self,
+        prefix: Optional[str] = None,
+        transport: Optional[str] = None,
+        fallback: bool = True,
+        http: Optional[SessionPool] = None
+    ):
+        self.prefix = (prefix or self.prefix).upper()
+        super().__init__(
+            instruction=os.environ[f"{self.prefix}_INSTRUCTION"],
+            tools=[self.ask],
+            http=http
+        )
+
+        kwargs = {"http": self.http, "fallback": fallback}
+        if transport:
+            kwargs["transport"] = transport
+        self.backend = DirectLineBackend.from_env(self.prefix, **kwargs)
+
+    @property
+    def name(self) -> str:
+        return self.prefix.lower()
+
+    async def start(self):
+        await super().start()
+        await self.backend.start()
+
+    async def close(self):
+        await self.backend.close()
+        await super().close()
+
+    async def fetch(self, message: str) -> str:
+        # Follow-ups within a session go to the same bot conversation
+        return await self.backend.ask(message, user_id=current_session())
+
+    def fetch_stream(self, message: str) -> AsyncIterator[str]:
+        # Bots that stream their answer show up as typing activities on the websocket
+        return progressive(
+            lambda on_partial: self.backend.ask(message, user_id=current_session(), on_partial=on_partial)
+        )
+
+    @ai_function(name="ask", description="Asks user's query to the DirectLine chatbot and returns response")
+    async def ask(
+        self,
+        message: Annotated[str, Field(description="Pesan user untuk dikirim ke Chatbot API.")]
+    ) -> str:
+        return await self.answer(message)
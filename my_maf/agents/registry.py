@@ -0,0 +1,147 @@
+import asyncio
+import importlib
+import importlib.util
+from collections.abc import Mapping
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from models.agent import AgentBaseModel
+from utils.config import missing
+
+Factory = Union[str, Callable[[], AgentBaseModel]]
+
+class AgentRegistry(Mapping):
+    """
+    Name -> agent mapping that constructs each agent on first access.
+
+    Registered factories (agent classes, or `"module:Class"` paths so the
+    agent's module isn't even imported until needed) are only called when
+    the orchestrator first routes to that agent, so startup cost doesn't
+    grow with the number of backends. `validate()` checks every registration
+    and its required settings up front without constructing anything. A
+    newly constructed agent warms up its pools in the background when an
+    event loop is running. Iterating and `in` only look at registered names;
+    use `loaded()` for the agents that actually exist.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Factory] = {}
+        self._descriptions: Dict[str, str] = {}
+        self._requires: Dict[str, Tuple[str, ...]] = {}
+        self._agents: Dict[str, AgentBaseModel] = {}
+        self._warming: set = set()
+
+    def register(
+        self,
+        name: str,
+        factory: Factory,
+        description: str = "",
+        requires: Iterable[str] = ()
+    ):
+        """Register `factory` under `name`; `requires` lists the settings it needs"""
+        if name in self._factories:
+            raise ValueError(f"Agent already registered: {name}")
+        if isinstance(factory, str) and ":" not in factory:
+            raise ValueError(f"Agent factory must be 'module:attribute', got {factory!r}")
+        self._factories[name] = factory
+        self._descriptions[name] = description
+        self._requires[name] = tuple(requires)
+
+    def validate(self) -> List[str]:
+        """Problems with the registrations (unknown modules, missing settings); empty when all is well"""
+        problems = []
+        for name, factory in self._factories.items():
+            if isinstance(factory, str):
+                module = factory.split(":", 1)[0]
+                try:
+                    found = importlib.util.find_spec(module) is not None
+                except ModuleNotFoundError:
+                    found = False
+                if not found:
+                    problems.append(f"{name}: module {module} not found")
+            absent = missing(self._requires[name])
+            if absent:
+                problems.append(f"{name}: missing {', '.join(absent)}")
+        return problems
+
+    def _construct(self, name: str) -> AgentBaseModel:
+        factory = self._factories[name]
+        if isinstance(factory, str):
+            module, attribute = factory.split(":", 1)
+            factory = getattr(importlib.import_module(module), attribute)
+        return factory()
+
+    def describe(self) -> Dict[str, str]:
+        """Description of every registered agent"""
+        return dict(self._descriptions)
+
+    def __getitem__(self, name: str) -> AgentBaseModel:
+        agent = self._agents.get(name)
+        if agent is None:
+            if name not in self._factories:
+                raise KeyError(name)
+            agent = self._construct(name)
+            self._agents[name] = agent
+            self._warm_up(agent)
+        return agent
+
+    def __contains__(self, name) -> bool:
+        return name in self._factories
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._factories)
+
+    def __len__(self) -> int:
+        return len(self._factories)
+
+    def loaded(self) -> Dict[str, AgentBaseModel]:
+        """Agents constructed so far"""
+        return dict(self._agents)
+
+    def _warm_up(self, agent: AgentBaseModel):
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = asyncio.ensure_future(self._start(agent))
+        self._warming.add(task)
+        task.add_done_callback(self._warming.discard)
+
+    async def _start(self, agent: AgentBaseModel):
+        try:
+            await agent.start()
+        except Exception as e:
+            print(f"[WARNING] Could not warm up {agent.name.upper()}: {e}")
+
+    async def start(self, *names: str):
+        """Construct and warm up the given agents now instead of on first use"""
+        new = [name for name in names if name not in self._agents]
+        for name in new:
+            self._agents[name] = self._construct(name)
+        await asyncio.gather(*(self._agents[name].start() for name in new))
+
+    async def close(self):
+        """Shutdown hook: close every constructed agent"""
+        for task in list(self._warming):
+            task.cancel()
+        for agent in self._agents.values():
+            await agent.close()
+        self._agents.clear()
+
+
+def _directline_settings(prefix: str) -> Tuple[str, ...]:
+    return tuple(f"{prefix}_{key}" for key in ("SECRET", "TOKEN_URL", "URL", "INSTRUCTION"))
+
+
+BUILTIN_AGENTS = [
+    ("aima_agent", "agents.aima:Aima", "PT Pertamina Trans Kontinental queries", ("AIMA_URL", "AIMA_INSTRUCTION")),
+    ("difa_agent", "agents.difa:Difa", "Jargas usecase queries", _directline_settings("DIFA")),
+    ("gino_agent", "agents.gino:Gino", "DPPU inspection queries", _directline_settings("GINO")),
+]
+
+
+def default_registry(names: Optional[list] = None) -> AgentRegistry:
+    """Registry of the built-in agents (optionally only `names`)"""
+    registry = AgentRegistry()
+    for name, factory, description, requires in BUILTIN_AGENTS:
+        if names is None or name in names:
+            registry.register(name, factory, description, requires)
+    return registry
@@ -0,0 +1,85 @@
+"""
+Offline benchmark: runs agents and the orchestrator against local stand-in
+servers and reports throughput, p50/p99 latency and median time to the
+first streamed chunk per scenario.
+
+    python -m bench                                   # every scenario
+    python -m bench difa-poll difa-ws --concurrency 16 --latency 1.0
+    python -m bench --json bench.json --phases
+
+Run from the my_maf directory. No Azure OpenAI, AIMA or DirectLine access
+is needed: the LLM is a scripted stub and the backends are emulated.
+"""
+import io
+import sys
+import json
+import asyncio
+import argparse
+from contextlib import redirect_stdout, nullcontext
+from bench.servers import FakeAima, FakeDirectLine, LatencyModel
+from bench.scenarios import SCENARIOS, configure_env, run_scenario, format_results
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Offline agent benchmark")
+    parser.add_argument("scenarios", nargs="*", help=f"scenarios to run (default: all): {', '.join(SCENARIOS)}")
+    parser.add_argument("--requests", type=int, default=100, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8, help="requests in flight at once")
+    parser.add_argument("--distinct", type=int, default=10, help="distinct questions per agent")
+    parser.add_argument("--aima-latency", type=float, default=0.5, help="AIMA reply delay (sec)")
+    parser.add_argument("--latency", type=float, default=0.5, help="DirectLine bot reply delay (sec)")
+    parser.add_argument("--partials", type=int, default=0,
+                        help="partial (typing) activities DirectLine bots stream before each reply")
+    parser.add_argument("--jitter", type=float, default=0.2, help="relative spread of backend delays")
+    parser.add_argument("--llm-latency", type=float, default=0.1, help="stub LLM think time (sec)")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for backend delays")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    parser.add_argument("--phases", action="store_true", help="print per-phase latencies for each scenario")
+    parser.add_argument("--verbose", action="store_true", help="show agent output while running")
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+    return args
+
+
+async def main(argv=None):
+    args = parse_args(argv)
+
+    aima = FakeAima(LatencyModel(args.aima_latency, args.jitter, args.seed))
+    directline = FakeDirectLine(LatencyModel(args.latency, args.jitter, args.seed), partials=args.partials)
+    await aima.start()
+    await directline.start()
+    configure_env(aima, directline)
+
+    results = []
+    try:
+        for name in args.scenarios or list(SCENARIOS):
+            print(f"[BENCH] {name}...", file=sys.stderr)
+            with nullcontext() if args.verbose else redirect_stdout(io.StringIO()):
+                result = await run_scenario(
+                    SCENARIOS[name], aima, directline,
+                    requests=args.requests,
+                    concurrency=args.concurrency,
+                    distinct=args.distinct,
+                    llm={"think": args.llm_latency},
+                )
+            results.append(result)
+
+            if args.phases:
+                print(f"\n{name}")
+                for phase, row in result["phases"].items():
+                    print(f"  {phase:<38} {row['count']:>6} {row['p50']:>8.3f} {row['p99']:>8.3f}")
+    finally:
+        await aima.stop()
+        await directline.stop()
+
+    print("\n" + format_results(results))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
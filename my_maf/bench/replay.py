@@ -0,0 +1,288 @@
+"""
+Replay a JSONL query log through run_orchestration.
+
+    python -m bench.replay queries.jsonl --qps 2 --concurrency 4
+    python -m bench.replay routing_log.jsonl --speed 10 --offline --router
+
+Each line needs a query (`query`, `message` or `text`) and may carry an
+arrival time (`timestamp`, `ts` or `time`: epoch seconds or ISO 8601) and
+the expected agent (`agent` or `expected_agent`), so the router's own
+decision log (written when ROUTER_LOG_PATH is set) can be replayed as is. Requests are fired at the recorded
+arrival pattern (sped up by `--speed`), or at `--qps` when given, with at
+most `--concurrency` in flight. Per-request results and a final summary
+line go to `--out`.
+
+Without `--offline` the real agents and orchestrator LLM are used, so the
+replay hits production services; with it, the local stand-in servers and
+stub LLMs from `python -m bench` are used instead.
+"""
+import io
+import os
+import sys
+import json
+import asyncio
+import argparse
+from datetime import datetime
+from contextlib import redirect_stdout, nullcontext
+from typing import List, Optional
+from bench.servers import FakeAima, FakeDirectLine, LatencyModel
+from bench.scenarios import FAILURE_MARKERS, TARGETS, Scenario, build_agents, configure_env
+from bench.stubs import StubOrchestrator
+
+REPLAY_RESULTS_PATH = os.environ.get("REPLAY_RESULTS_PATH", "replay_results.jsonl")
+
+def _parse_time(value) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+
+
+def load_queries(path: str) -> List[dict]:
+    """Read replayable records (`query`, `timestamp`, `expected`) from a JSONL file"""
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                raw = json.loads(line)
+            except json.JSONDecodeError:
+                print(f"[REPLAY] Skipping malformed line {line_no}", file=sys.stderr)
+                continue
+
+            query = raw.get("query") or raw.get("message") or raw.get("text")
+            if not query:
+                continue
+            records.append({
+                "query": query,
+                "timestamp": _parse_time(raw.get("timestamp", raw.get("ts", raw.get("time")))),
+                "expected": raw.get("expected_agent") or raw.get("agent"),
+            })
+    return records
+
+
+def schedule(records: List[dict], qps: Optional[float] = None, speed: float = 1.0) -> List[float]:
+    """
+    Start offset (sec) of each record.
+
+    `qps` spaces requests evenly; otherwise recorded timestamps are replayed
+    relative to the first one, divided by `speed`. Records without a
+    timestamp are sent as soon as concurrency allows.
+    """
+    if qps:
+        return [i / qps for i in range(len(records))]
+
+    stamps = [r["timestamp"] for r in records if r["timestamp"] is not None]
+    if not stamps:
+        return [0.0] * len(records)
+    first = min(stamps)
+    return [
+        (r["timestamp"] - first) / speed if r["timestamp"] is not None else 0.0
+        for r in records
+    ]
+
+
+def outcome(result) -> str:
+    """Classify a run_orchestration result as ok / timeout / error / failed"""
+    if not isinstance(result, dict):
+        return "error"
+    error = result.get("Error")
+    if error:
+        return "timeout" if "Deadline" in error else "error"
+    response = str(result.get("response") or "").strip()
+    if not response or any(marker in response for marker in FAILURE_MARKERS):
+        return "failed"
+    return "ok"
+
+
+async def replay(
+    orchestrator,
+    agents: dict,
+    records: List[dict],
+    offsets: List[float],
+    concurrency: int = 4,
+    out_path: Optional[str] = REPLAY_RESULTS_PATH,
+    **orchestration_kwargs,
+) -> dict:
+    """Fire `records` at their `offsets`, write per-request results, return the summary"""
+    from orchestrator import run_orchestration
+
+    semaphore = asyncio.Semaphore(concurrency)
+    results: List[Optional[dict]] = [None] * len(records)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+
+    async def one(i: int, record: dict, offset: float):
+        await asyncio.sleep(max(0.0, start + offset - loop.time()))
+        scheduled = loop.time()
+        async with semaphore:
+            started = loop.time()
+            try:
+                result = await run_orchestration(orchestrator, agents, record["query"], **orchestration_kwargs)
+                status = outcome(result)
+            except Exception as e:
+                result, status = {"Error": str(e)}, "exception"
+            finished = loop.time()
+
+        chosen = result.get("agent") if isinstance(result, dict) else None
+        results[i] = {
+            "type": "request",
+            "index": i,
+            "query": record["query"],
+            "offset": round(offset, 3),
+            "queued": round(started - scheduled, 4),
+            "latency": round(finished - started, 4),
+            "agent": chosen,
+            "expected": record["expected"],
+            "correct": (chosen == record["expected"]) if record["expected"] else None,
+            "outcome": status,
+            "error": result.get("Error") if isinstance(result, dict) else None,
+        }
+
+    await asyncio.gather(*(one(i, r, o) for i, (r, o) in enumerate(zip(records, offsets))))
+    summary = summarize(results, loop.time() - start)
+
+    if out_path:
+        with open(out_path, "w", encoding="utf-8") as f:
+            for row in results:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+            f.write(json.dumps({"type": "summary", **summary}, ensure_ascii=False) + "\n")
+    return summary
+
+
+def summarize(results: List[dict], elapsed: float) -> dict:
+    """Throughput, latency percentiles, outcomes and routing accuracy"""
+    from utils.tracing import Histogram
+
+    latency, queued = Histogram(size=len(results) or 1), Histogram(size=len(results) or 1)
+    per_agent: dict = {}
+    outcomes: dict = {}
+    for row in results:
+        latency.record(row["latency"])
+        queued.record(row["queued"])
+        outcomes[row["outcome"]] = outcomes.get(row["outcome"], 0) + 1
+        agent = row["agent"] if isinstance(row["agent"], str) else "+".join(row["agent"] or []) or "-"
+        per_agent.setdefault(agent, Histogram(size=len(results))).record(row["latency"])
+
+    labelled = [row for row in results if row["correct"] is not None]
+    correct = sum(1 for row in labelled if row["correct"])
+
+    return {
+        "requests": len(results),
+        "elapsed": round(elapsed, 3),
+        "throughput": round(len(results) / elapsed, 3) if elapsed else None,
+        "outcomes": outcomes,
+        "latency": {f"p{q}": latency.percentile(q) for q in (50, 90, 99)},
+        "latency_max": max(latency.samples, default=None),
+        "queued": {f"p{q}": queued.percentile(q) for q in (50, 99)},
+        "agents": {
+            name: {"count": h.count, "p50": h.percentile(50), "p99": h.percentile(99)}
+            for name, h in sorted(per_agent.items())
+        },
+        "routing": {
+            "labelled": len(labelled),
+            "correct": correct,
+            "accuracy": round(correct / len(labelled), 4) if labelled else None,
+        },
+    }
+
+
+def format_summary(summary: dict) -> str:
+    lines = [
+        f"Requests:   {summary['requests']} in {summary['elapsed']:.1f} sec ({summary['throughput'] or 0:.2f} req/s)",
+        f"Outcomes:   {', '.join(f'{k}={v}' for k, v in sorted(summary['outcomes'].items()))}",
+        "Latency:    " + "  ".join(f"{k}={v or 0:.3f}" for k, v in summary["latency"].items())
+        + f"  max={summary['latency_max'] or 0:.3f}",
+        "Queued:     " + "  ".join(f"{k}={v or 0:.3f}" for k, v in summary["queued"].items()),
+    ]
+    routing = summary["routing"]
+    if routing["labelled"]:
+        lines.append(f"Routing:    {routing['correct']}/{routing['labelled']} correct ({routing['accuracy']:.1%})")
+    for name, row in summary["agents"].items():
+        lines.append(f"  {name:<20} {row['count']:>6}  p50={row['p50'] or 0:.3f}  p99={row['p99'] or 0:.3f}")
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.replay", description="Replay a JSONL query log")
+    parser.add_argument("path", help="JSONL file of queries")
+    parser.add_argument("--qps", type=float, help="fixed arrival rate instead of the recorded timestamps")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay recorded arrivals this many times faster")
+    parser.add_argument("--concurrency", type=int, default=4, help="requests in flight at once")
+    parser.add_argument("--limit", type=int, help="replay only the first N queries")
+    parser.add_argument("--out", default=REPLAY_RESULTS_PATH, help="results file (JSONL)")
+    parser.add_argument("--offline", action="store_true", help="use the local stand-in servers and stub LLMs")
+    parser.add_argument("--router", action="store_true", help="offline: route with LocalRouter before the stub LLM")
+    parser.add_argument("--latency", type=float, default=0.5, help="offline: backend reply delay (sec)")
+    parser.add_argument("--verbose", action="store_true", help="show orchestration output while running")
+    return parser.parse_args(argv)
+
+
+async def main(argv=None):
+    args = parse_args(argv)
+    records = load_queries(args.path)[:args.limit]
+    if not records:
+        print(f"[REPLAY] No queries in {args.path}", file=sys.stderr)
+        return
+    offsets = schedule(records, qps=args.qps, speed=args.speed)
+
+    servers = []
+    if args.offline:
+        aima = FakeAima(LatencyModel(args.latency))
+        directline = FakeDirectLine(LatencyModel(args.latency))
+        servers = [aima, directline]
+        for server in servers:
+            await server.start()
+        configure_env(aima, directline)
+
+        from agents.registry import AgentRegistry
+        from router import LocalRouter
+
+        agents = AgentRegistry()
+        for name, agent in build_agents(Scenario("replay", "orchestration"), list(TARGETS), {}).items():
+            agents.register(name, lambda agent=agent: agent)
+        orchestrator = StubOrchestrator(
+            {r["query"]: r["expected"] for r in records if r["expected"] in agents}, list(TARGETS)[0]
+        )
+        router = LocalRouter(log_path=None) if args.router else None
+        routing_cache = None
+    else:
+        from agents.registry import default_registry
+        from models.client import create_chat_agent
+        from orchestrator import ORCHESTRATOR_INSTRUCTION, check_config, create_routing_cache
+        from router import LocalRouter, ROUTER_ENABLED
+
+        agents = default_registry()
+        check_config(agents)
+        orchestrator = create_chat_agent(ORCHESTRATOR_INSTRUCTION)
+        router = LocalRouter() if ROUTER_ENABLED else None
+        routing_cache = create_routing_cache()
+
+    print(f"[REPLAY] {len(records)} queries over {max(offsets):.1f} sec, concurrency {args.concurrency}", file=sys.stderr)
+    try:
+        # Warm every agent up front so start-up doesn't count against the first requests
+        await agents.start(*agents)
+        with nullcontext() if args.verbose else redirect_stdout(io.StringIO()):
+            summary = await replay(
+                orchestrator, agents, records, offsets,
+                concurrency=args.concurrency, out_path=args.out,
+                router=router, routing_cache=routing_cache,
+            )
+    finally:
+        await agents.close()
+        for server in servers:
+            await server.stop()
+
+    print(format_summary(summary))
+    if args.out:
+        print(f"\nResults written to {args.out}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,255 @@
+import os
+import time
+import asyncio
+from typing import List, Optional, Tuple
+import aiohttp
+from bench.servers import FakeAima, FakeDirectLine
+from bench.stubs import StubOrchestrator, with_stub_llm
+
+# Backends served by the fake servers, keyed by orchestrator agent name
+TARGETS = {
+    "aima_agent": "aima",
+    "difa_agent": "difa",
+    "gino_agent": "gino",
+}
+
+TOPICS = {
+    "aima": "armada kapal PT Pertamina Trans Kontinental",
+    "difa": "usecase Jargas",
+    "gino": "inspeksi DPPU",
+}
+
+# Answers that mean the request failed even though no exception escaped
+FAILURE_MARKERS = ("Error", "tidak merespons", "tidak tersedia", "waktu pemrosesan habis")
+
+class Scenario:
+    """
+    One benchmark configuration.
+
+    `target` is "orchestration" (the full run_orchestration path over every
+    agent) or a single backend name. `transport` only applies to DirectLine
+    backends. `pooled=False` disables HTTP keep-alive and the warm
+    DirectLine conversation pool; `cached=True` gives the agents an
+    in-memory answer cache (and the orchestrator a routing cache).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        target: str,
+        transport: str = "ws",
+        pooled: bool = True,
+        cached: bool = False,
+        direct: bool = False,
+    ):
+        self.name = name
+        self.target = target
+        self.transport = transport
+        self.pooled = pooled
+        self.cached = cached
+        self.direct = direct
+
+
+SCENARIOS = {
+    s.name: s for s in [
+        Scenario("aima", "aima"),
+        Scenario("aima-unpooled", "aima", pooled=False),
+        Scenario("aima-cached", "aima", cached=True),
+        Scenario("difa-poll", "difa", transport="poll"),
+        Scenario("difa-ws", "difa", transport="ws"),
+        Scenario("difa-ws-unpooled", "difa", transport="ws", pooled=False),
+        Scenario("difa-poll-unpooled", "difa", transport="poll", pooled=False),
+        Scenario("difa-ws-cached", "difa", transport="ws", cached=True),
+        Scenario("gino-ws", "gino", transport="ws"),
+        Scenario("orchestration", "orchestration"),
+        Scenario("orchestration-direct", "orchestration", direct=True),
+        Scenario("orchestration-cached", "orchestration", cached=True),
+    ]
+}
+
+def configure_env(aima: FakeAima, directline: FakeDirectLine):
+    """
+    Point every backend at the fake servers.
+
+    Must run before the agent modules are imported: they read their
+    configuration at import time.
+    """
+    env = {
+        "AZURE_OPENAI_API_VERSION": "bench",
+        "AZURE_OPENAI_API_KEY": "bench",
+        "AZURE_OPENAI_CHAT_DEPLOYMENT_NAME": "bench",
+        "ORCHESTRATOR_INSTRUCTION": "bench",
+        "AIMA_URL": aima.url,
+        "AIMA_INSTRUCTION": "bench",
+        # Caches are set up per scenario, in memory only
+        "ANSWER_CACHE_ENABLED": "false",
+        "TRACE_VERBOSE": "false",
+    }
+    for prefix in ("DIFA", "GINO"):
+        bot = prefix.lower()
+        env[f"{prefix}_SECRET"] = "bench"
+        env[f"{prefix}_TOKEN_URL"] = directline.token_url(bot)
+        env[f"{prefix}_URL"] = directline.url(bot)
+        env[f"{prefix}_INSTRUCTION"] = "bench"
+    os.environ.update(env)
+
+
+def workload(targets: List[str], requests: int, distinct: int) -> List[Tuple[str, str]]:
+    """`requests` (agent, query) pairs cycling over `distinct` questions per agent"""
+    queries = [
+        (agent, f"Pertanyaan {i + 1} tentang {TOPICS[TARGETS[agent]]}")
+        for i in range(distinct)
+        for agent in targets
+    ]
+    return [queries[i % len(queries)] for i in range(requests)]
+
+
+def _session_pool(pooled: bool):
+    from utils.http import SessionPool
+
+    class UnpooledSessionPool(SessionPool):
+        """Sessions that open a new TCP connection for every request"""
+
+        def _new_session(self) -> aiohttp.ClientSession:
+            return aiohttp.ClientSession(connector=aiohttp.TCPConnector(force_close=True))
+
+    return SessionPool() if pooled else UnpooledSessionPool()
+
+
+def build_agents(scenario: Scenario, targets: List[str], llm: dict) -> dict:
+    from agents.aima import Aima
+    from agents.difa import Difa
+    from agents.gino import Gino
+    from utils.cache import TTLCache
+
+    classes = {"aima_agent": Aima, "difa_agent": Difa, "gino_agent": Gino}
+    http = _session_pool(scenario.pooled)
+
+    agents = {}
+    for name in targets:
+        cls = with_stub_llm(classes[name], **llm)
+        if name == "aima_agent":
+            agent = cls(http=http)
+        else:
+            agent = cls(transport=scenario.transport, http=http)
+            if not scenario.pooled:
+                for pool in (agent.backend.stream_pool, agent.backend.poll_pool):
+                    pool.size = 0
+                    pool.max_turns = 1
+        agent.answer_cache = TTLCache(max_size=4096, ttl=3600) if scenario.cached else None
+        agents[name] = agent
+    return agents
+
+
+def _failed(response) -> bool:
+    text = str(response or "").strip()
+    return not text or any(marker in text for marker in FAILURE_MARKERS)
+
+
+async def run_scenario(
+    scenario: Scenario,
+    aima: FakeAima,
+    directline: FakeDirectLine,
+    requests: int = 100,
+    concurrency: int = 8,
+    distinct: int = 10,
+    llm: Optional[dict] = None,
+) -> dict:
+    """Run `requests` requests through `scenario`, `concurrency` at a time, and summarize"""
+    from orchestrator import run_orchestration
+    from utils.cache import TTLCache
+    from utils.tracing import Histogram, tracer
+
+    if scenario.target == "orchestration":
+        targets = list(TARGETS)
+    else:
+        targets = [name for name, backend in TARGETS.items() if backend == scenario.target]
+
+    agents = build_agents(scenario, targets, llm or {})
+    load = workload(targets, requests, distinct)
+    orchestrator = StubOrchestrator(
+        {query: agent for agent, query in load}, targets[0], think=(llm or {}).get("think", 0.1)
+    )
+    routing_cache = TTLCache(max_size=4096, ttl=3600) if scenario.cached else None
+
+    await asyncio.gather(*(agent.start() for agent in agents.values()))
+    tracer.histograms.clear()
+    backend_before = aima.requests + directline.requests
+    conversations_before = directline.conversations_started
+    reopened_before = directline.conversations_reopened
+
+    latency = Histogram(size=requests)
+    first_chunk = Histogram(size=requests)
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(agent_name: str, query: str):
+        nonlocal errors
+        async with semaphore:
+            start_time = time.monotonic()
+            first = []
+
+            def on_chunk(text: str):
+                if not first:
+                    first.append(time.monotonic() - start_time)
+
+            try:
+                if scenario.target == "orchestration":
+                    result = await run_orchestration(
+                        orchestrator, agents, query, fan_out_mode="off",
+                        routing_cache=routing_cache, direct=scenario.direct, speculate=False,
+                        on_chunk=on_chunk
+                    )
+                    response = result.get("response") if "Error" not in result else None
+                else:
+                    response = await agents[agent_name].respond(
+                        query, verbose=False, direct=scenario.direct
+                    )
+            except Exception:
+                response = None
+            elapsed = time.monotonic() - start_time
+            latency.record(elapsed)
+            # Non-streaming paths show nothing until the whole answer is there
+            first_chunk.record(first[0] if first else elapsed)
+            if _failed(response):
+                errors += 1
+
+    start_time = time.monotonic()
+    try:
+        await asyncio.gather(*(one(agent_name, query) for agent_name, query in load))
+        elapsed = time.monotonic() - start_time
+    finally:
+        for agent in agents.values():
+            await agent.close()
+
+    return {
+        "scenario": scenario.name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput": requests / elapsed if elapsed else 0.0,
+        "p50": latency.percentile(50),
+        "p99": latency.percentile(99),
+        "mean": sum(latency.samples) / len(latency.samples) if latency.samples else None,
+        "ttfb": first_chunk.percentile(50),
+        "backend_requests": aima.requests + directline.requests - backend_before,
+        "conversations": directline.conversations_started - conversations_before,
+        # Conversations started with an already used token (should stay 0)
+        "conversations_reopened": directline.conversations_reopened - reopened_before,
+        "phases": tracer.summary(),
+    }
+
+
+def format_results(results: List[dict]) -> str:
+    """Fixed-width comparison table of scenario results"""
+    lines = [
+        f"{'scenario':<24}{'reqs':>6}{'conc':>6}{'errors':>8}{'req/s':>9}"
+        f"{'p50':>9}{'p99':>9}{'mean':>9}{'ttfb':>9}{'backend':>9}{'convs':>7}"
+    ]
+    for r in results:
+        lines.append(
+            f"{r['scenario']:<24}{r['requests']:>6}{r['concurrency']:>6}{r['errors']:>8}"
+            f"{r['throughput']:>9.2f}{r['p50'] or 0:>9.3f}{r['p99'] or 0:>9.3f}{r['mean'] or 0:>9.3f}{r['ttfb'] or 0:>9.3f}"
+            f"{r['backend_requests']:>9}{r['conversations']:>7}"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,224 @@
+import asyncio
+import random
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Dict, List, Optional
+from aiohttp import web, WSMsgType
+
+class LatencyModel:
+    """Reply delay of `latency` seconds, spread uniformly by ±`jitter` (relative)"""
+
+    def __init__(self, latency: float = 0.5, jitter: float = 0.2, seed: Optional[int] = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.random = random.Random(seed)
+
+    def sample(self) -> float:
+        spread = self.latency * self.jitter
+        return max(0.0, self.random.uniform(self.latency - spread, self.latency + spread))
+
+
+class FakeServer(ABC):
+    """Base for the local stand-in servers: start on a free port, stop on shutdown"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self._runner: Optional[web.AppRunner] = None
+
+    @abstractmethod
+    def app(self) -> web.Application:
+        """The server's routes"""
+        pass
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # Resolve the port picked by the OS when port=0
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+class FakeAima(FakeServer):
+    """
+    AIMA-style chatbot endpoint.
+
+    `POST /aima` answers `{"messages": [...]}` after the configured delay
+    with `context.data_points.text` passages derived from the question, the
+    shape `Aima.fetch` parses.
+    """
+
+    def __init__(self, latency: Optional[LatencyModel] = None, passages: int = 3, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency or LatencyModel()
+        self.passages = passages
+
+    @property
+    def url(self) -> str:
+        return self.base_url + "/aima"
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/aima", self.handle)
+        return app
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        payload = await request.json()
+        question = payload["messages"][-1]["content"]
+        await asyncio.sleep(self.latency.sample())
+
+        text = [f"[{i + 1}] Passage {i + 1} untuk pertanyaan: {question}" for i in range(self.passages)]
+        return web.json_response({
+            "message": {"role": "assistant", "content": text[0]},
+            "context": {"data_points": {"text": text}},
+        })
+
+
+class FakeConversation:
+    def __init__(self, conv_id: str):
+        self.id = conv_id
+        self.activities: List[dict] = []
+        self.sockets: List[web.WebSocketResponse] = []
+
+    def add(self, activity: dict):
+        activity["id"] = f"{self.id}|{len(self.activities):07d}"
+        self.activities.append(activity)
+
+        payload = {"activities": [activity], "watermark": str(len(self.activities))}
+        for ws in list(self.sockets):
+            if not ws.closed:
+                asyncio.ensure_future(ws.send_json(payload))
+
+
+class FakeDirectLine(FakeServer):
+    """
+    DirectLine 3.0 emulator hosting several bots, one per path prefix.
+
+    Per bot it serves the token endpoint (`GET /<bot>/token`), conversation
+    start (`POST /<bot>/conversations`, with a `streamUrl`), activity posts
+    and watermark polling (`/<bot>/conversations/<id>/activities`) and the
+    websocket stream. Like the real service, a token from the token endpoint
+    is bound to the first conversation started with it: starting another
+    conversation with the same token reopens that one (counted in
+    `conversations_reopened`). Posted activities are echoed like the real
+    service, and the bot replies with a `replyToId` after the configured
+    delay. With
+    `partials`, the bot streams its answer: that many `typing` activities
+    carrying the text so far are spread over the delay before the reply.
+    """
+
+    def __init__(self, latency: Optional[LatencyModel] = None, partials: int = 0, **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency or LatencyModel()
+        self.partials = partials
+        self.conversations: Dict[str, FakeConversation] = {}
+        self.counts: Dict[str, int] = defaultdict(int)
+        self.tokens_issued = 0
+        self.conversations_started = 0
+        self.conversations_reopened = 0
+        self._token_conversations: Dict[str, str] = {}
+
+    def token_url(self, bot: str) -> str:
+        return f"{self.base_url}/{bot}/token"
+
+    def url(self, bot: str) -> str:
+        return f"{self.base_url}/{bot}/conversations"
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/{bot}/token", self.token)
+        app.router.add_post("/{bot}/conversations", self.start_conversation)
+        app.router.add_post("/{bot}/conversations/{conv}/activities", self.post_activity)
+        app.router.add_get("/{bot}/conversations/{conv}/activities", self.get_activities)
+        app.router.add_get("/{bot}/conversations/{conv}/stream", self.stream)
+        return app
+
+    def _conversation(self, request: web.Request) -> FakeConversation:
+        conv = self.conversations.get(request.match_info["conv"])
+        if conv is None:
+            raise web.HTTPNotFound()
+        return conv
+
+    async def token(self, request: web.Request) -> web.Response:
+        self.tokens_issued += 1
+        return web.json_response({"token": f"token-{self.tokens_issued}", "expires_in": 1800})
+
+    async def start_conversation(self, request: web.Request) -> web.Response:
+        bot = request.match_info["bot"]
+        token = request.headers.get("Authorization", "").removeprefix("Bearer ")
+        conv_id = self._token_conversations.get(token)
+        if conv_id is not None:
+            self.conversations_reopened += 1
+        else:
+            self.conversations_started += 1
+            conv_id = f"{bot}-{self.conversations_started}"
+            self.conversations[conv_id] = FakeConversation(conv_id)
+            self._token_conversations[token] = conv_id
+
+        stream_url = f"ws://{self.host}:{self.port}/{bot}/conversations/{conv_id}/stream"
+        return web.json_response({"conversationId": conv_id, "token": "conv-token", "streamUrl": stream_url})
+
+    async def post_activity(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        conv = self._conversation(request)
+        activity = await request.json()
+        conv.add(activity)
+        asyncio.ensure_future(self._reply(request.match_info["bot"], conv, activity))
+        return web.json_response({"id": activity["id"]})
+
+    async def _reply(self, bot: str, conv: FakeConversation, activity: dict):
+        text = f"{bot.upper()} menjawab: {activity.get('text', '')}"
+        words = text.split(" ")
+        step = self.latency.sample() / (self.partials + 1)
+
+        for i in range(1, self.partials + 1):
+            await asyncio.sleep(step)
+            conv.add({
+                "type": "typing",
+                "from": {"id": bot, "name": bot.upper()},
+                "text": " ".join(words[:max(1, len(words) * i // (self.partials + 1))]),
+                "replyToId": activity["id"],
+                "channelData": {"streamType": "streaming", "streamSequence": i},
+            })
+
+        await asyncio.sleep(step)
+        self.counts[bot] += 1
+        conv.add({
+            "type": "message",
+            "from": {"id": bot, "name": bot.upper()},
+            "text": text,
+            "replyToId": activity["id"],
+        })
+
+    async def get_activities(self, request: web.Request) -> web.Response:
+        conv = self._conversation(request)
+        watermark = int(request.query.get("watermark") or 0)
+        return web.json_response({
+            "activities": conv.activities[watermark:],
+            "watermark": str(len(conv.activities)),
+        })
+
+    async def stream(self, request: web.Request) -> web.WebSocketResponse:
+        conv = self._conversation(request)
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        conv.sockets.append(ws)
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.ERROR:
+                    break
+        finally:
+            conv.sockets.remove(ws)
+        return ws
@@ -0,0 +1,81 @@
+"""
+Cold-start import report for the entry points.
+
+    python -m bench.startup                      # main, server, orchestrator
+    python -m bench.startup agents.aima --top 20
+
+Imports each module in a fresh interpreter with `python -X importtime` and
+reports the wall time of the import plus the slowest top-level packages it
+pulled in (cumulative time, so a package's own dependencies are included).
+Run from the my_maf directory.
+"""
+import sys
+import argparse
+import subprocess
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+DEFAULT_MODULES = ["main", "server", "orchestrator"]
+
+def import_times(module: str) -> Tuple[float, Dict[str, float]]:
+    """Total import time of `module` and cumulative time per top-level package (sec)"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        name = name[1:].rstrip()
+        entries.append((len(name) - len(name.lstrip()), name.strip(), int(cumulative) / 1e6))
+
+    # -X importtime prints children before their parent; walk it parent-first
+    # and count a package's cumulative time where it is entered from another package
+    packages: Dict[str, float] = defaultdict(float)
+    total = 0.0
+    stack: List[Tuple[int, str]] = []
+    inside = False
+    for depth, name, seconds in reversed(entries):
+        if depth == 0:
+            # Interpreter start-up (site, encodings, ...) isn't part of the module's cost
+            inside = name == module
+            if inside:
+                total = seconds
+        while stack and stack[-1][0] >= depth:
+            stack.pop()
+        package = name.split(".")[0]
+        if inside and stack and stack[-1][1] != package:
+            packages[package] += seconds
+        stack.append((depth, package))
+    return total, dict(packages)
+
+
+def format_report(module: str, total: float, packages: Dict[str, float], top: int) -> List[str]:
+    lines = [f"{module:<40} {total:>8.3f} sec"]
+    for name, seconds in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        lines.append(f"  {name:<38} {seconds:>8.3f}")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench.startup", description="Import-time report")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="modules to import")
+    parser.add_argument("--top", type=int, default=10, help="slowest packages to list per module")
+    args = parser.parse_args(argv)
+
+    for module in args.modules:
+        try:
+            total, packages = import_times(module)
+        except RuntimeError as e:
+            print(f"{module:<40} failed: {e}")
+            continue
+        print("\n".join(format_report(module, total, packages, args.top)) + "\n")
+
+
+if __name__ == "__main__":
+    main()
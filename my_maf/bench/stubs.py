@@ -0,0 +1,71 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Dict
+
+class StubResponse:
+    """Stands in for the agent framework's run/run_stream result objects"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def __str__(self) -> str:
+        return self.text
+
+
+class StubChatAgent:
+    """
+    Chat agent with a scripted LLM: "thinks" for `think` seconds, calls the
+    backend tool exactly once with the query, then streams the tool answer
+    back in `chunk_size`-character chunks `chunk_delay` seconds apart.
+    """
+
+    def __init__(
+        self,
+        tool: Callable[[str], Awaitable[str]],
+        think: float = 0.1,
+        chunk_size: int = 32,
+        chunk_delay: float = 0.005,
+    ):
+        self.tool = tool
+        self.think = think
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+
+    async def run(self, query: str) -> StubResponse:
+        await asyncio.sleep(self.think)
+        answer = await self.tool(query)
+        await asyncio.sleep(self.chunk_delay * (len(answer) // self.chunk_size + 1))
+        return StubResponse(answer)
+
+    async def run_stream(self, query: str) -> AsyncIterator[StubResponse]:
+        await asyncio.sleep(self.think)
+        answer = await self.tool(query)
+        for i in range(0, len(answer), self.chunk_size):
+            await asyncio.sleep(self.chunk_delay)
+            yield StubResponse(answer[i:i + self.chunk_size])
+
+
+class StubOrchestrator:
+    """Routing LLM that answers with the agent recorded for each benchmark query"""
+
+    def __init__(self, routes: Dict[str, str], default: str, think: float = 0.1):
+        self.routes = routes
+        self.default = default
+        self.think = think
+
+    async def run(self, user_input: str) -> StubResponse:
+        await asyncio.sleep(self.think)
+        agent = self.routes.get(user_input, self.default)
+        return StubResponse(repr({"agent": agent, "message": user_input}))
+
+
+def with_stub_llm(cls, **options):
+    """
+    Subclass of the agent class `cls` whose LLM is a StubChatAgent.
+
+    The subclass keeps the class name, so the agent's `name` (and with it
+    its `<NAME>_*` configuration and breaker) is unchanged.
+    """
+    def _create_agent(self):
+        return StubChatAgent(self.answer, **options)
+
+    return type(cls.__name__, (cls,), {"_create_agent": _create_agent})
@@ -1,20 +1,19 @@
+from utils.startup import startup, enabled as startup_profile_enabled
 import os
 import ast
+import uuid
 import asyncio
-from dotenv import load_dotenv
-from azure.identity import AzureCliCredential
-from agent_framework.azure import AzureOpenAIChatClient
-# from agents.aima import Aima
-# from agents.difa import Difa
-# from agents.gino import Gino
-from agents.new_aima import Aima
-from agents.new_difa import Difa
-from agents.new_gino import Gino
-from orchestrator import run_orchestration
+from agents.registry import default_registry
+from models.agent import get_answer_cache
+from models.client import create_chat_agent
+from orchestrator import (
+    ORCHESTRATOR_INSTRUCTION, run_orchestration, create_routing_cache, create_session_store, check_config
+)
+from router import LocalRouter, ROUTER_ENABLED
+from utils.config import load_config
 
-load_dotenv()
-
-ORCHESTRATOR_INSTRUCTION = os.environ["ORCHESTRATOR_INSTRUCTION"]
+load_config()
+startup.mark("imports")
 
 async def interactive_cli():
     """Interactive CLI for testing orchestrator"""
@@ -24,47 +23,74 @@ async def interactive_cli():
     print("=" * 60)
     print("\nInitializing agents...")
     
-    orchestrator = AzureOpenAIChatClient(
-        credential=AzureCliCredential()
-    ).create_agent(
-        instructions=ORCHESTRATOR_INSTRUCTION,
-    )
+    # Agents are constructed (and warmed up) the first time a query is routed to them
+    agents = default_registry()
+    check_config(agents)
+    startup.mark("config")
 
-    agents = {
-        'aima_agent': Aima(),
-        'difa_agent': Difa(),
-        'gino_agent': Gino()
-    }
-    
-    print("✓ All agents initialized!\n")
+    orchestrator = create_chat_agent(ORCHESTRATOR_INSTRUCTION)
+    router = LocalRouter() if ROUTER_ENABLED else None
+    routing_cache = create_routing_cache()
+    # The CLI is one conversation until the user starts a new one
+    sessions = create_session_store()
+    session_id = uuid.uuid4().hex
+    startup.mark("orchestrator")
+
+    print("✓ Agents registered!\n")
+    if startup_profile_enabled():
+        print(startup.report() + "\n")
     print("Available agents:")
-    print("  - aima_agent: PT Pertamina Trans Kontinental queries")
-    print("  - difa_agent: Jargas usecase queries")
-    print("  - gino_agent: DPPU inspection queries")
+    for name, description in agents.describe().items():
+        print(f"  - {name}: {description}")
     print("\nCommands:")
     print("  'quit' or 'exit' - Exit the CLI")
     print("  'clear' - Clear screen")
+    print("  'clear cache' - Drop cached backend answers")
+    print("  'new' - Start a new conversation")
     print("=" * 60)
     
-    while True:
-        print("\n" + "-" * 60)
-        user_input = input("You: ").strip()
-        
-        if not user_input:
-            continue
+    try:
+        while True:
+            print("\n" + "-" * 60)
+            user_input = input("You: ").strip()
             
-        if user_input.lower() in ['quit', 'exit', 'q']:
-            print("\nExiting... Goodbye!")
-            break
+            if not user_input:
+                continue
+                
+            if user_input.lower() in ['quit', 'exit', 'q']:
+                print("\nExiting... Goodbye!")
+                break
+                
+            if user_input.lower() == 'clear cache':
+                # Covers agents that haven't been constructed yet too
+                answer_cache = get_answer_cache()
+                if answer_cache is not None:
+                    answer_cache.clear()
+                print("✓ Answer cache cleared")
+                continue
+                
+            if user_input.lower() == 'new':
+                if sessions is not None:
+                    sessions.clear(session_id)
+                # A fresh session id also gets fresh DirectLine conversations
+                session_id = uuid.uuid4().hex
+                print("✓ Conversation history cleared")
+                continue
+
+            if user_input.lower() == 'clear':
+                os.system('clear' if os.name != 'nt' else 'cls')
+                continue
             
-        if user_input.lower() == 'clear':
-            os.system('clear' if os.name != 'nt' else 'cls')
-            continue
-        
-        try:
-            await run_orchestration(orchestrator, agents, user_input)
-        except Exception as e:
-            print(f"\n[ERROR] {e}")
+            try:
+                await run_orchestration(
+                    orchestrator, agents, user_input,
+                    router=router, routing_cache=routing_cache,
+                    sessions=sessions, session_id=session_id
+                )
+            except Exception as e:
+                print(f"\n[ERROR] {e}")
+    finally:
+        await agents.close()
 
 if __name__ == "__main__":
     asyncio.run(interactive_cli())
\ No newline at end of file
@@ -1,32 +1,324 @@
 import time
 import os
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Optional, List
-from azure.identity import AzureCliCredential
-from agent_framework.azure import AzureOpenAIChatClient
-from dotenv import load_dotenv
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import AsyncIterator, Callable, Iterable, Optional, List
+from models.client import create_chat_agent
+from utils.http import SessionPool, session_pool
+from utils.cache import TTLCache
+from utils.singleflight import SingleFlight
+from utils.deadline import Deadline, detached, within_deadline
+from utils.breaker import CircuitBreaker, CircuitOpenError
+from utils.ratelimit import RateLimiter
+from utils.batch import BATCH_CONCURRENCY, as_completed
+from utils.tracing import tracer
+from utils.text import normalize_query
+from utils.session import current_session, session_scope, with_history
+from utils.streaming import Appender, Progress, progressive
+from utils.config import load_config
 
-load_dotenv()
+load_config()
 
-AZURE_OPENAI_API_VERSION = os.environ["AZURE_OPENAI_API_VERSION"]
-AZURE_OPENAI_API_KEY = os.environ["AZURE_OPENAI_API_KEY"]
-AZURE_OPENAI_CHAT_DEPLOYMENT_NAME = os.environ["AZURE_OPENAI_CHAT_DEPLOYMENT_NAME"]
+ANSWER_CACHE_ENABLED = os.environ.get("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_SIZE = int(os.environ.get("ANSWER_CACHE_SIZE", "4096"))
+ANSWER_CACHE_TTL = float(os.environ.get("ANSWER_CACHE_TTL", "21600"))
+ANSWER_CACHE_PATH = os.environ.get("ANSWER_CACHE_PATH", "answer_cache.db")
+
+DEADLINE_FALLBACK = "Maaf, waktu pemrosesan habis sebelum jawaban lengkap tersedia."
+
+_answer_cache: Optional[TTLCache] = None
+
+# Speculatively started backend call handed to the routed agent (see `use_prefetched`)
+_prefetched: ContextVar[Optional[dict]] = ContextVar("prefetched_answer", default=None)
+
+# Success (True) or failure (False) of each backend answer within a `respond` call
+_outcomes: ContextVar[Optional[List[bool]]] = ContextVar("backend_outcomes", default=None)
+
+class AgentError(Exception):
+    """
+    An agent couldn't answer (backend failure, open circuit or deadline)
+
+    Raised by `respond(raise_on_failure=True)`; the message is the text the
+    user would otherwise have been shown (or the orchestrator's error).
+    """
+
+def get_answer_cache() -> Optional[TTLCache]:
+    """Process-wide backend answer cache (None when disabled)"""
+    global _answer_cache
+    if ANSWER_CACHE_ENABLED and _answer_cache is None:
+        _answer_cache = TTLCache(
+            max_size=ANSWER_CACHE_SIZE,
+            ttl=ANSWER_CACHE_TTL,
+            path=ANSWER_CACHE_PATH or None,
+            table="answers",
+        )
+    return _answer_cache
 
 class AgentBaseModel(ABC):  
-    def __init__(self, instruction: str, tools: Optional[List] = None):
+    # Backends that keep per-session conversation state; their session answers bypass the answer cache
+    stateful: bool = False
+
+    def __init__(
+        self,
+        instruction: str,
+        tools: Optional[List] = None,
+        http: Optional[SessionPool] = None,
+        answer_cache: Optional[TTLCache] = None,
+        direct: Optional[bool] = None
+    ):
         self.instruction = instruction
         self.tools = tools or []
-        self.agent = self._create_agent()
+        self.http = http or session_pool
+        self.answer_cache = answer_cache or get_answer_cache()
+        self.inflight = SingleFlight()
+        self.breaker = CircuitBreaker.from_env(self.name)
+        self.rate_limiter = RateLimiter.from_env(self.name)
+        if direct is None:
+            direct = os.environ.get(f"{self.name.upper()}_DIRECT_MODE", "false").lower() == "true"
+        self.direct = direct
+        self._agent = None
+
+    @property
+    def name(self) -> str:
+        return self.__class__.__name__.lower()
+
+    async def session(self):
+        """Shared keep-alive HTTP session for this agent's backend"""
+        return await self.http.get(self.name)
+
+    async def start(self):
+        """Startup hook: warm up the backend connection pool"""
+        await self.http.start(self.name)
+
+    async def close(self):
+        """Shutdown hook: release pooled connections"""
+        await self.http.close()
     
+    @property
+    def agent(self):
+        """The LLM chat agent, created on first use"""
+        if self._agent is None:
+            self._agent = self._create_agent()
+        return self._agent
+
     def _create_agent(self):
-        agent = AzureOpenAIChatClient(
-            credential=AzureCliCredential()
-        ).create_agent(
-            instructions=self.instruction,
-            tools=self.tools,
-        )
-        return agent
+        return create_chat_agent(self.instruction, self.tools)
     
+    @property
+    def cache_ttl(self) -> float:
+        """Answer cache TTL, overridable per backend with `<NAME>_CACHE_TTL`"""
+        return float(os.environ.get(f"{self.name.upper()}_CACHE_TTL", ANSWER_CACHE_TTL))
+
+    def _cache_key(self, message: str) -> str:
+        return f"{self.name}:{normalize_query(message)}"
+
+    def _session(self) -> Optional[str]:
+        """Session the backend answers in (None for stateless backends)"""
+        return current_session() if self.stateful else None
+
+    def _flight_key(self, message: str) -> str:
+        # Within a session a stateful backend answers in that session's own conversation
+        session_id = self._session()
+        key = self._cache_key(message)
+        return key if session_id is None else f"{key}@{session_id}"
+
+    def _request_cache(self) -> Optional[TTLCache]:
+        """The answer cache, unless a stateful backend answers within a session (from that session's context)"""
+        return self.answer_cache if self._session() is None else None
+
+    async def call_backend(self, message: str) -> str:
+        """Backend answer for `message`, served from the answer cache when possible"""
+        prefetched = _prefetched.get()
+        if prefetched is not None and prefetched.get("agent") == self.name:
+            task = prefetched.pop("task", None)
+            if task is not None and not task.cancelled():
+                try:
+                    return await task
+                except Exception as e:
+                    print(f"[{self.name.upper()} TOOL] Speculative call failed ({e}), retrying")
+
+        key = self._cache_key(message)
+        cache = self._request_cache()
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                print(f"[{self.name.upper()} TOOL] Answer cache hit")
+                return cached
+
+        # Concurrent identical questions (of the same session) share one
+        # backend round trip; each caller still gives up when its own deadline expires
+        session_id = self._session()
+        return await within_deadline(
+            self.inflight.do(self._flight_key(message), lambda: self._shared_fetch(key, message, session_id))
+        )
+
+    async def _shared_fetch(
+        self,
+        key: str,
+        message: str,
+        session_id: Optional[str] = None,
+        on_progress: Optional[Progress] = None
+    ) -> str:
+        """
+        `_fetch_and_cache` as run for every caller coalesced on `key`
+
+        The task starts with a copy of the first caller's context; its
+        deadline and prefetched answer must not apply to the others, so the
+        call runs without them and each waiter is limited by its own
+        deadline only. Only callers of the same session (`session_id`, part
+        of the coalescing key) share a call.
+        """
+        _prefetched.set(None)
+        with detached(), session_scope(session_id):
+            return await self._fetch_and_cache(key, message, on_progress)
+
+    async def _fetch_and_cache(self, key: str, message: str, on_progress: Optional[Progress] = None) -> str:
+        # Cache hits and coalesced callers don't count against the backend's rate limit
+        if self.rate_limiter is not None:
+            await within_deadline(self.rate_limiter.acquire())
+
+        # Fails fast while the backend's circuit is open
+        self.breaker.acquire()
+        start_time = time.monotonic()
+        try:
+            if on_progress is None:
+                answer = await self.fetch(message)
+            else:
+                answer = ""
+                async for answer in self.fetch_stream(message):
+                    on_progress(answer)
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        except Exception:
+            self.breaker.record(False, time.monotonic() - start_time)
+            raise
+        self.breaker.record(True, time.monotonic() - start_time)
+
+        cache = self._request_cache()
+        if cache is not None and answer:
+            cache.set(key, answer, ttl=self.cache_ttl)
+        return answer
+
+    def prefetch(self, message: str) -> asyncio.Task:
+        """Start a backend call in the background (speculative dispatch)"""
+        return asyncio.ensure_future(self.call_backend(message))
+
+    @contextmanager
+    def use_prefetched(self, task: asyncio.Task):
+        """
+        Serve this agent's next backend call from `task`
+
+        The prefetched answer was fetched for the raw user query, so it is
+        used for the first tool call regardless of how the message was
+        rephrased by the orchestrator or the agent LLM.
+        """
+        token = _prefetched.set({"agent": self.name, "task": task})
+        try:
+            yield
+        finally:
+            _prefetched.reset(token)
+
+    def _failure(self, e: Exception) -> str:
+        if isinstance(e, TimeoutError):
+            return f"{self.name.upper()} tidak merespons dalam waktu yang ditentukan."
+        if isinstance(e, CircuitOpenError):
+            return f"{self.name.upper()} sedang tidak tersedia, silakan coba lagi nanti."
+        return f"Error accessing {self.name.upper()}: {e}"
+
+    def _record_outcome(self, ok: bool):
+        outcomes = _outcomes.get()
+        if outcomes is not None:
+            outcomes.append(ok)
+
+    async def answer(self, message: str) -> str:
+        """Backend answer with failures turned into a message for the user/LLM"""
+        try:
+            with tracer.span("backend.call", backend=self.name):
+                answer = await self.call_backend(message)
+        except Exception as e:
+            self._record_outcome(False)
+            return self._failure(e)
+        self._record_outcome(True)
+        return answer
+
+    async def answer_stream(self, message: str) -> AsyncIterator[str]:
+        """
+        `answer`, yielding the answer so far while the backend streams it
+
+        Each item supersedes the previous one and the last is the complete
+        answer (or the failure message). Prefetched, cached and coalesced
+        answers arrive as a single item.
+        """
+        key, flight_key = self._cache_key(message), self._flight_key(message)
+        prefetched = _prefetched.get()
+        if (prefetched is not None and prefetched.get("agent") == self.name and "task" in prefetched) \
+                or flight_key in self.inflight:
+            yield await self.answer(message)
+            return
+
+        cache = self._request_cache()
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                print(f"[{self.name.upper()} TOOL] Answer cache hit")
+                self._record_outcome(True)
+                yield cached
+                return
+
+        session_id = self._session()
+
+        async def run(on_progress: Progress) -> str:
+            with tracer.span("backend.call", backend=self.name, stream=True):
+                return await within_deadline(self.inflight.do(
+                    flight_key, lambda: self._shared_fetch(key, message, session_id, on_progress)
+                ))
+
+        text = ""
+        try:
+            async for text in progressive(run):
+                yield text
+        except Exception as e:
+            self._record_outcome(False)
+            # Keep what the user has already seen of a partial answer
+            yield (text + "\n\n" if text else "") + self._failure(e)
+        else:
+            self._record_outcome(True)
+
+    def postprocess(self, answer: str) -> str:
+        """Lightweight clean-up applied to backend answers in direct mode"""
+        return answer.strip()
+
+    def invalidate(self, message: Optional[str] = None):
+        """Drop the cached answer for `message`, or every cached answer of this backend"""
+        if self.answer_cache is None:
+            return
+        if message is None:
+            self.answer_cache.invalidate_prefix(f"{self.name}:")
+        else:
+            self.answer_cache.invalidate(self._cache_key(message))
+
+    @abstractmethod
+    async def fetch(self, message: str) -> str:
+        """
+        Query the backend directly, without caching
+
+        Raises on failure (TimeoutError when the backend doesn't answer in time)
+        so that errors are never cached.
+        """
+        pass
+
+    async def fetch_stream(self, message: str) -> AsyncIterator[str]:
+        """
+        `fetch`, yielding the answer so far while the backend produces it
+
+        Each item supersedes the previous one and the last is the complete
+        answer. Backends that can't stream yield the whole answer once.
+        """
+        yield await self.fetch(message)
+
     @abstractmethod
     async def ask(self, query: str) -> str:
         """
@@ -40,21 +332,128 @@ class AgentBaseModel(ABC):
         """
         pass
     
-    async def stream(self, query: str):
-        """Stream response from agent"""
-        print(f"\nStreaming {self.__class__.__name__} Agent...\n")  
+    async def stream(
+        self,
+        query: str,
+        direct: Optional[bool] = None,
+        deadline: Optional[Deadline] = None,
+        on_chunk: Optional[Callable[[str], None]] = None,
+        history: str = ""
+    ) -> str:
+        """
+        Stream response from agent
+
+        Each piece of text is passed to `on_chunk` as it arrives (printed to
+        stdout by default). Runs under `deadline` (or the caller's current
+        one); if it expires, whatever was streamed so far is returned with a
+        fallback note. `history` (see `SessionStore.history`) is shown to the
+        agent LLM before the query; direct-mode backend calls get the query
+        alone.
+
+        In direct mode the backend's answer is forwarded as it arrives (see
+        `answer_stream`). If a backend replaces its partial answer with a
+        final one that doesn't continue it, the final answer is emitted in
+        full after what was already shown, and is what's returned.
+        """
+        emit = on_chunk or (lambda text: print(text, end="", flush=True))
 
-        async for chunk in self.agent.run_stream(query):
-            if chunk.text:
-                print(chunk.text, end="", flush=True)
+        with deadline.scope() if deadline is not None else nullcontext():
+            if self.direct if direct is None else direct:
+                # Direct mode: the backend answer goes straight to the user, no agent LLM hops
+                print(f"\nDirect {self.__class__.__name__} Agent...\n")
+                shown = Appender()
+                async for text in self.answer_stream(query):
+                    chunk = shown.feed(self.postprocess(text))
+                    if chunk:
+                        emit(chunk)
+                if shown.sent != shown.text:
+                    emit(("\n\n" if shown.sent else "") + shown.text)
+                return shown.text
+
+            print(f"\nStreaming {self.__class__.__name__} Agent...\n")  
+
+            chunks = []
+
+            async def consume():
+                with tracer.span("agent.llm", agent=self.name, stream=True):
+                    async for chunk in self.agent.run_stream(with_history(history, query)):
+                        if chunk.text:
+                            chunks.append(chunk.text)
+                            emit(chunk.text)
+
+            try:
+                await within_deadline(consume())
+            except TimeoutError:
+                chunks.append(("\n\n" if chunks else "") + DEADLINE_FALLBACK)
+                emit(chunks[-1])
+            return "".join(chunks)
     
-    async def respond(self, query: str) -> str:
-        """Get non-streaming response from agent"""
-        print(f"\nResponding without stream ({self.__class__.__name__})...\n")
-        
-        result = await self.agent.run(query)
+    async def respond(
+        self,
+        query: str,
+        verbose: bool = True,
+        direct: Optional[bool] = None,
+        deadline: Optional[Deadline] = None,
+        history: str = "",
+        raise_on_failure: bool = False
+    ) -> str:
+        """
+        Get non-streaming response from agent (`history` as in `stream`)
+
+        Failures are answered with a message for the user, or raised as
+        AgentError with `raise_on_failure`. A response counts as failed when
+        the deadline expired or every backend call made for it failed (the
+        agent LLM would only have apologised for it).
+        """
+        if verbose:
+            print(f"\nResponding without stream ({self.__class__.__name__})...\n")
+
+        outcomes: List[bool] = []
+        token = _outcomes.set(outcomes)
+        failed = False
+        try:
+            with deadline.scope() if deadline is not None else nullcontext():
+                if self.direct if direct is None else direct:
+                    result = self.postprocess(await self.answer(query))
+                else:
+                    try:
+                        with tracer.span("agent.llm", agent=self.name, stream=False):
+                            result = await within_deadline(self.agent.run(with_history(history, query)))
+                    except TimeoutError:
+                        result, failed = DEADLINE_FALLBACK, True
+        finally:
+            _outcomes.reset(token)
+
+        if raise_on_failure and (failed or (outcomes and not any(outcomes))):
+            raise AgentError(str(result))
 
-        print(f"{self.__class__.__name__}:", result, "\n")
+        if verbose:
+            print(f"{self.__class__.__name__}:", result, "\n")
         return result
 
+    def ask_many(
+        self,
+        queries: Iterable[str],
+        concurrency: int = BATCH_CONCURRENCY
+    ) -> AsyncIterator[dict]:
+        """
+        Backend answers for many queries, yielded as they complete
+
+        Runs at most `concurrency` questions at once; each result is a dict
+        with `index`, `query`, `response`, `error` and `latency`. Backend
+        failures are reported in `error`, not turned into answer text.
+        """
+        return as_completed(queries, self.call_backend, concurrency)
 
+    def respond_many(
+        self,
+        queries: Iterable[str],
+        concurrency: int = BATCH_CONCURRENCY,
+        direct: Optional[bool] = None
+    ) -> AsyncIterator[dict]:
+        """Agent responses for many queries, yielded as they complete (see `ask_many`; failures are AgentError)"""
+        return as_completed(
+            queries,
+            lambda query: self.respond(query, verbose=False, direct=direct, raise_on_failure=True),
+            concurrency
+        )
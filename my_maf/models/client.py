@@ -0,0 +1,98 @@
+import os
+import time
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from utils.config import load_config
+
+load_config()
+
+CREDENTIAL_REFRESH_MARGIN = float(os.environ.get("CREDENTIAL_REFRESH_MARGIN", "300"))
+
+# Settings the shared chat client can't work without (checked by `check_config`)
+CHAT_CLIENT_SETTINGS = (
+    "AZURE_OPENAI_API_VERSION",
+    "AZURE_OPENAI_API_KEY",
+    "AZURE_OPENAI_CHAT_DEPLOYMENT_NAME",
+)
+
+# azure.identity and agent_framework are imported on first use: they are
+# the slowest imports in the process and short-lived jobs may never need them
+_credential: Optional["CachedCredential"] = None
+_chat_client = None
+_lock = threading.Lock()
+
+class CachedCredential:
+    """
+    Token credential that caches tokens in memory until shortly before they expire.
+
+    `AzureCliCredential` shells out to `az` for every token request; wrapping
+    it means the subprocess runs once per scope per token lifetime instead
+    of once per client and request. Requests with `claims` (challenges)
+    always go to the wrapped credential.
+    """
+
+    def __init__(self, credential, refresh_margin: float = CREDENTIAL_REFRESH_MARGIN):
+        self.credential = credential
+        self.refresh_margin = refresh_margin
+        self._tokens: Dict[Tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    def _cached(self, key: Tuple, fetch):
+        token = self._tokens.get(key)
+        if token is not None and token.expires_on - self.refresh_margin > time.time():
+            return token
+
+        with self._lock:
+            token = self._tokens.get(key)
+            if token is None or token.expires_on - self.refresh_margin <= time.time():
+                token = fetch()
+                self._tokens[key] = token
+            return token
+
+    def get_token(self, *scopes: str, claims: Optional[str] = None, tenant_id: Optional[str] = None, **kwargs):
+        if claims:
+            return self.credential.get_token(*scopes, claims=claims, tenant_id=tenant_id, **kwargs)
+        return self._cached(
+            ("token", scopes, tenant_id),
+            lambda: self.credential.get_token(*scopes, tenant_id=tenant_id, **kwargs)
+        )
+
+    def get_token_info(self, *scopes: str, options: Optional[dict] = None):
+        if options and options.get("claims"):
+            return self.credential.get_token_info(*scopes, options=options)
+        tenant_id = (options or {}).get("tenant_id")
+        return self._cached(
+            ("token_info", scopes, tenant_id),
+            lambda: self.credential.get_token_info(*scopes, options=options)
+        )
+
+    def close(self):
+        self.credential.close()
+
+
+def get_credential() -> CachedCredential:
+    """Process-wide Azure credential with an in-memory token cache"""
+    global _credential
+    with _lock:
+        if _credential is None:
+            from azure.identity import AzureCliCredential
+            _credential = CachedCredential(AzureCliCredential())
+        return _credential
+
+
+def get_chat_client():
+    """Process-wide Azure OpenAI chat client shared by the orchestrator and every agent"""
+    global _chat_client
+    credential = get_credential()
+    with _lock:
+        if _chat_client is None:
+            from agent_framework.azure import AzureOpenAIChatClient
+            _chat_client = AzureOpenAIChatClient(credential=credential)
+        return _chat_client
+
+
+def create_chat_agent(instructions: str, tools: Optional[List] = None):
+    """Chat agent on the shared client"""
+    if tools:
+        return get_chat_client().create_agent(instructions=instructions, tools=tools)
+    return get_chat_client().create_agent(instructions=instructions)
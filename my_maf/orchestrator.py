@@ -1,67 +1,368 @@
 import os
 import ast
 import asyncio
-from dotenv import load_dotenv
-from azure.identity import AzureCliCredential
-from agent_framework.azure import AzureOpenAIChatClient
-# from agents.aima import Aima
-# from agents.difa import Difa
-# from agents.gino import Gino
-from agents.new_aima import Aima
-from agents.new_difa import Difa
-from agents.new_gino import Gino
+from typing import AsyncIterator, Callable, Iterable, Optional
+from agents.registry import AgentRegistry, default_registry
+from models.client import CHAT_CLIENT_SETTINGS, create_chat_agent
+from router import LocalRouter, ROUTER_ENABLED
+from utils.cache import TTLCache
+from utils.session import SessionStore, session_scope, with_history
+from utils.text import routing_key
+from utils.deadline import Deadline, within_deadline
+from utils.tracing import tracer
+from utils.batch import BATCH_CONCURRENCY, as_completed
+from utils.config import ConfigError, load_config, missing
+from models.agent import DEADLINE_FALLBACK, AgentError
 
-load_dotenv()
+load_config()
 
-ORCHESTRATOR_INSTRUCTION = os.environ["ORCHESTRATOR_INSTRUCTION"]
+# Checked by `check_config` rather than at import, so tools can import this module freely
+ORCHESTRATOR_INSTRUCTION = os.environ.get("ORCHESTRATOR_INSTRUCTION", "")
+ORCHESTRATOR_FANOUT = os.environ.get("ORCHESTRATOR_FANOUT", "off")  # off | merge | first
+ORCHESTRATOR_FANOUT_TIMEOUT = float(os.environ.get("ORCHESTRATOR_FANOUT_TIMEOUT", "60"))
+ORCHESTRATOR_FANOUT_MAX = int(os.environ.get("ORCHESTRATOR_FANOUT_MAX", "3"))
+ORCHESTRATOR_SPECULATE = os.environ.get("ORCHESTRATOR_SPECULATE", "false").lower() == "true"
+ORCHESTRATOR_TIMEOUT = float(os.environ.get("ORCHESTRATOR_TIMEOUT", "90"))
+ROUTING_CACHE_ENABLED = os.environ.get("ROUTING_CACHE_ENABLED", "true").lower() == "true"
+ROUTING_CACHE_SIZE = int(os.environ.get("ROUTING_CACHE_SIZE", "2048"))
+ROUTING_CACHE_TTL = float(os.environ.get("ROUTING_CACHE_TTL", "86400"))
+ROUTING_CACHE_PATH = os.environ.get("ROUTING_CACHE_PATH", "")
+SESSION_ENABLED = os.environ.get("SESSION_ENABLED", "true").lower() == "true"
+SESSION_MAX = int(os.environ.get("SESSION_MAX", "1024"))
+SESSION_IDLE_TTL = float(os.environ.get("SESSION_IDLE_TTL", "3600"))
+SESSION_PATH = os.environ.get("SESSION_PATH", "")
+SESSION_HISTORY_TOKENS = int(os.environ.get("SESSION_HISTORY_TOKENS", "1000"))
+SESSION_ANSWER_CHARS = int(os.environ.get("SESSION_ANSWER_CHARS", "600"))
 
-async def run_orchestration(orchestrator, agents, user_input: str):
-    """Run multi-agent orchestration"""
+def check_config(agents):
+    """
+    Fail fast, listing every missing setting at once, before anything is built
 
-    routing_raw = await orchestrator.run(user_input)
+    Covers the orchestrator, the shared chat client and, for an
+    AgentRegistry, every registered agent.
+    """
+    problems = []
+    absent = missing(("ORCHESTRATOR_INSTRUCTION",) + CHAT_CLIENT_SETTINGS)
+    if absent:
+        problems.append(f"orchestrator: missing {', '.join(absent)}")
+    if isinstance(agents, AgentRegistry):
+        problems += agents.validate()
+    if problems:
+        raise ConfigError("Invalid configuration:\n  " + "\n  ".join(problems))
 
-    try:
-        routing = ast.literal_eval(str(routing_raw))
-    except:
-        print("[ERROR] Failed to parse JSON.")
-        return {
-            "Error": "[ORCHESTRATOR] Failed to parse JSON",
-            "raw_response": routing_raw
-        }
+def create_routing_cache() -> Optional[TTLCache]:
+    """Routing decision cache (query -> routed agent names) configured from ROUTING_CACHE_* (None when disabled)"""
+    if not ROUTING_CACHE_ENABLED:
+        return None
+    return TTLCache(
+        max_size=ROUTING_CACHE_SIZE,
+        ttl=ROUTING_CACHE_TTL,
+        path=ROUTING_CACHE_PATH or None,
+        table="routing",
+    )
+
+def create_session_store() -> Optional[SessionStore]:
+    """Conversation history store configured from SESSION_* (None when disabled)"""
+    if not SESSION_ENABLED:
+        return None
+    return SessionStore(
+        max_sessions=SESSION_MAX,
+        idle_ttl=SESSION_IDLE_TTL,
+        path=SESSION_PATH or None,
+        history_tokens=SESSION_HISTORY_TOKENS,
+        answer_chars=SESSION_ANSWER_CHARS,
+    )
+
+def ranked_targets(routing: dict, agents: dict) -> list:
+    """
+    Turn a routing decision into a ranked list of (agent_name, message).
+
+    Accepts the single-agent form `{"agent": ..., "message": ...}` and the
+    fan-out form `{"agents": [...], "message": ...}`, where each entry is an
+    agent name or `{"agent": ..., "message": ...}`. Unknown agents are dropped.
+    """
+    default_message = routing.get("message")
+    targets = routing.get("agents") or routing.get("agent") or []
+    if isinstance(targets, (str, dict)):
+        targets = [targets]
+
+    ranked = []
+    for target in targets:
+        if isinstance(target, dict):
+            name, message = target.get("agent"), target.get("message") or default_message
+        else:
+            name, message = target, default_message
+        if name in agents and name not in [n for n, _ in ranked]:
+            ranked.append((name, message))
+    return ranked
+
+def healthy_targets(ranked: list, agents: dict) -> list:
+    """Drop agents whose backend circuit is open, keeping the ranking order"""
+    healthy = []
+    for name, message in ranked:
+        if agents[name].breaker.available():
+            healthy.append((name, message))
+        else:
+            print(f"[BREAKER] Skipping {name}: backend circuit is open")
+    return healthy
+
+def breaker_states(agents) -> dict:
+    """Circuit breaker snapshot of every (constructed) agent's backend"""
+    if isinstance(agents, AgentRegistry):
+        agents = agents.loaded()
+    return {name: agent.breaker.snapshot() for name, agent in agents.items()}
+
+def _discard(spec_task: Optional[asyncio.Task]):
+    """Cancel a speculative prefetch the request won't use, before it reaches the backend or the cache"""
+    if spec_task is not None and not spec_task.done():
+        spec_task.cancel()
+
+def _is_good(answer) -> bool:
+    return bool(str(answer or "").strip())
 
-    target_agent = routing.get("agent")
-    message = routing.get("message")
+async def fan_out(
+    agents,
+    ranked: list,
+    strategy: str = "merge",
+    timeout: float = ORCHESTRATOR_FANOUT_TIMEOUT,
+    direct: Optional[bool] = None,
+    history: str = ""
+) -> str:
+    """
+    Query several agents concurrently under one shared deadline.
+
+    `merge` waits for every agent (until the deadline) and combines the good
+    answers in rank order; `first` returns the first good answer and cancels
+    the rest. Agents that fail (timeouts, open circuits, backend errors) are
+    reported by `respond` as AgentError and never count as answers.
+    """
+    tasks = {
+        asyncio.ensure_future(
+            agents[name].respond(message, verbose=False, direct=direct, history=history, raise_on_failure=True)
+        ): name
+        for name, message in ranked
+    }
+    deadline = asyncio.get_running_loop().time() + timeout
+    answers = {}
+    pending = set(tasks)
 
     try:
-        agent = agents[target_agent]
-    except:
-        print("[ERROR] Unknown Agent.")
-        return {"Error": "[ORCHESTRATOR] Unknown agent"}
+        while pending:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(
+                pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                name = tasks[task]
+                if task.exception() is not None:
+                    print(f"[FAN-OUT] {name} failed: {task.exception()}")
+                    continue
+                if _is_good(task.result()):
+                    answers[name] = str(task.result())
+                    if strategy == "first":
+                        return answers[name]
+    finally:
+        for task in pending:
+            task.cancel()
+
+    if not answers:
+        return "Tidak ada agent yang merespons dalam waktu yang ditentukan."
+
+    order = [name for name, _ in ranked if name in answers]
+    if len(order) == 1:
+        return answers[order[0]]
+    return "\n\n".join(f"[{name}]\n{answers[name]}" for name in order)
+
+async def run_orchestration(
+    orchestrator,
+    agents,
+    user_input: str,
+    fan_out_mode: str = ORCHESTRATOR_FANOUT,
+    router: Optional[LocalRouter] = None,
+    routing_cache: Optional[TTLCache] = None,
+    direct: Optional[bool] = None,
+    speculate: bool = ORCHESTRATOR_SPECULATE,
+    timeout: float = ORCHESTRATOR_TIMEOUT,
+    on_chunk: Optional[Callable[[str], None]] = None,
+    sessions: Optional[SessionStore] = None,
+    session_id: Optional[str] = None
+):
+    """
+    Run multi-agent orchestration
+
+    `direct` forces (True) or disables (False) pass-through mode for the
+    routed agent; by default each agent's own `<NAME>_DIRECT_MODE` applies.
+    With `speculate`, the router's most likely agent starts fetching the
+    answer while the orchestrator LLM is still routing; the work is kept if
+    the orchestrator picks the same agent and cancelled otherwise.
+
+    The whole request runs under one `timeout`-second deadline that every
+    agent, tool and backend step below inherits; when it expires, pending
+    work is cancelled and a partial or fallback answer is returned.
+
+    Answer text is passed to `on_chunk` as it is produced (see
+    `AgentBaseModel.stream`); merged fan-out answers arrive as one chunk.
+
+    With `sessions` and a `session_id`, the session's earlier turns are
+    shown to the orchestrator and agent LLMs, the answer is recorded as a
+    new turn, and DirectLine backends keep one bot conversation per session.
+    Follow-ups in a session bypass the routing cache, whose decisions only
+    hold for standalone questions, and session requests to stateful
+    backends bypass the answer cache, since those answers come from the
+    session's own context. Without `sessions`, `session_id` is ignored.
+    """
+
+    if sessions is None:
+        session_id = None
+    history = sessions.history(session_id) if sessions is not None else ""
 
-    message = routing.get("message")
-    await agent.stream(message)
+    with Deadline(timeout).scope() as deadline, session_scope(session_id), tracer.request(), tracer.span("orchestrator.request") as request_span:
+        # Fast paths: a cached decision or a confident local route skips the orchestrator LLM call
+        cache_key = routing_key(user_input) if not history else ""
+        cached = routing_cache.get(cache_key) if routing_cache is not None and cache_key else None
+        # Only the chosen agents are cached; the LLM's rewrite was for the question that was cached
+        routing = {"agents": cached, "message": user_input} if isinstance(cached, list) else None
+        from_llm = False
+        spec_agent, spec_task = None, None
+
+        try:
+            if routing is not None:
+                request_span.set(route="cache")
+                print(f"[ROUTER] Cached route to {', '.join(cached)}")
+            elif router is not None and (routing := router.route(user_input, agents)) is not None:
+                request_span.set(route="local")
+                print(f"[ROUTER] Local route to {routing['agent']}")
+            else:
+                request_span.set(route="llm")
+                if speculate and router is not None:
+                    spec_agent = router.predict(user_input, agents)
+                    if spec_agent is not None and agents[spec_agent].breaker.available():
+                        print(f"[SPECULATE] Prefetching {spec_agent} while routing")
+                        spec_task = agents[spec_agent].prefetch(user_input)
+
+                with tracer.span("orchestrator.route"):
+                    routing_raw = await within_deadline(orchestrator.run(with_history(history, user_input)))
+
+                try:
+                    routing = ast.literal_eval(str(routing_raw))
+                except:
+                    print("[ERROR] Failed to parse JSON.")
+                    _discard(spec_task)
+                    return {
+                        "Error": "[ORCHESTRATOR] Failed to parse JSON",
+                        "raw_response": routing_raw
+                    }
+                from_llm = True
+
+                # A follow-up may have been routed by its context rather than its own words
+                if router is not None and not history and isinstance(routing.get("agent"), str) and routing["agent"] in agents:
+                    router.learn(user_input, routing["agent"])
+
+            ranked = ranked_targets(routing, agents)
+            if not ranked:
+                print("[ERROR] Unknown Agent.")
+                _discard(spec_task)
+                return {"Error": "[ORCHESTRATOR] Unknown agent"}
+
+            if from_llm and routing_cache is not None and cache_key:
+                routing_cache.set(cache_key, [name for name, _ in ranked])
+
+            # Fail fast (or reroute to the next ranked agent) when a backend is down
+            ranked = healthy_targets(ranked, agents)
+            if not ranked:
+                _discard(spec_task)
+                return {
+                    "Error": "[ORCHESTRATOR] Backend unavailable",
+                    "response": "Layanan yang dibutuhkan sedang tidak tersedia, silakan coba lagi nanti."
+                }
+
+            if fan_out_mode in ("merge", "first") and len(ranked) > 1:
+                ranked = ranked[:ORCHESTRATOR_FANOUT_MAX]
+                print(f"\nFan-out ({fan_out_mode}) to {', '.join(name for name, _ in ranked)}...\n")
+                _discard(spec_task)
+
+                response = await fan_out(
+                    agents, ranked, strategy=fan_out_mode,
+                    timeout=deadline.cap(ORCHESTRATOR_FANOUT_TIMEOUT), direct=direct, history=history
+                )
+                (on_chunk or print)(response)
+                names = [name for name, _ in ranked]
+                if sessions is not None and session_id is not None:
+                    sessions.record(session_id, user_input, ", ".join(names), response)
+                return {"agent": names, "message": ranked[0][1], "response": response}
+
+            target_agent, message = ranked[0]
+            agent = agents[target_agent]
+            request_span.set(agent=target_agent)
+
+            if spec_task is not None and target_agent == spec_agent:
+                print(f"[SPECULATE] Orchestrator agreed, reusing {spec_agent} prefetch")
+                with agent.use_prefetched(spec_task):
+                    response = await agent.stream(message, direct=direct, on_chunk=on_chunk, history=history)
+            else:
+                if spec_task is not None:
+                    print(f"[SPECULATE] Orchestrator chose {target_agent}, discarding {spec_agent} prefetch")
+                    _discard(spec_task)
+                response = await agent.stream(message, direct=direct, on_chunk=on_chunk, history=history)
+
+            if sessions is not None and session_id is not None:
+                sessions.record(session_id, user_input, target_agent, response)
+            return {"agent": target_agent, "message": message, "response": response}
+
+        except TimeoutError:
+            print(f"\n[ORCHESTRATOR] Deadline of {timeout:.0f} sec exceeded")
+            return {"Error": "[ORCHESTRATOR] Deadline exceeded", "response": DEADLINE_FALLBACK}
+
+        finally:
+            _discard(spec_task)
+
+def run_orchestration_many(
+    orchestrator,
+    agents,
+    queries: Iterable[str],
+    concurrency: int = BATCH_CONCURRENCY,
+    **kwargs
+) -> AsyncIterator[dict]:
+    """
+    Run `run_orchestration` over many queries, at most `concurrency` at once
+
+    Yields `{"index", "query", "response", "error", "latency"}` as each one
+    completes; `response` is the orchestration result dict. Results carrying
+    an `"Error"` (unparsable routing, unknown or unavailable agent, deadline)
+    are reported as an AgentError in `error` instead. Keyword arguments are
+    passed on to `run_orchestration`. Per-backend rate limits
+    (`<NAME>_RATE_LIMIT`) still apply to the agents' backend calls.
+    """
+    async def run(query: str) -> dict:
+        result = await run_orchestration(orchestrator, agents, query, **kwargs)
+        if "Error" in result:
+            raise AgentError(result["Error"])
+        return result
+
+    return as_completed(queries, run, concurrency)
 
 if __name__ == "__main__":
     async def main():
         print("[BEGIN]\n")
 
-        orchestrator = AzureOpenAIChatClient(
-            credential=AzureCliCredential()
-        ).create_agent(
-            instructions=ORCHESTRATOR_INSTRUCTION,
-        )
-
-        agents = {
-            'aima_agent': Aima(),
-            'difa_agent': Difa(),
-            'gino_agent': Gino()
-        }
+        agents = default_registry()
+        check_config(agents)
+        orchestrator = create_chat_agent(ORCHESTRATOR_INSTRUCTION)
 
         # query = "Jenis kargo apa saja yang diangkut oleh PT Pertamina Trans Kontinental?" # aima
         # query = "Siapa saja yang tergabung dalam usecase Jargas?" # difa
         query = "Apa lembaga inspeksi yang melakukan inspeksi untuk DPPU Ahmad Yani?" # gino
         print("User:", query)
 
-        await run_orchestration(orchestrator, agents, query)
+        try:
+            await run_orchestration(
+                orchestrator, agents, query,
+                router=LocalRouter() if ROUTER_ENABLED else None,
+                routing_cache=create_routing_cache()
+            )
+        finally:
+            await agents.close()
 
     asyncio.run(main())
\ No newline at end of file
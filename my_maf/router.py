@@ -0,0 +1,187 @@
+import os
+import json
+import math
+import asyncio
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+from utils.text import content_tokens
+from utils.config import load_config
+
+load_config()
+
+ROUTER_ENABLED = os.environ.get("ROUTER_ENABLED", "true").lower() == "true"
+# Empty: LLM routing decisions are learned in memory only, not logged
+ROUTER_LOG_PATH = os.environ.get("ROUTER_LOG_PATH", "")
+ROUTER_MIN_SCORE = float(os.environ.get("ROUTER_MIN_SCORE", "0.2"))
+ROUTER_MIN_MARGIN = float(os.environ.get("ROUTER_MIN_MARGIN", "0.5"))
+ROUTER_MAX_EXAMPLES = int(os.environ.get("ROUTER_MAX_EXAMPLES", "5000"))
+ROUTER_PREDICT_MIN_SCORE = float(os.environ.get("ROUTER_PREDICT_MIN_SCORE", "0.1"))
+ROUTER_REFIT_EVERY = int(os.environ.get("ROUTER_REFIT_EVERY", "20"))
+
+# Seed examples so the router is useful before any decisions are logged
+SEED_EXAMPLES = [
+    ("Jenis kargo apa saja yang diangkut oleh PT Pertamina Trans Kontinental?", "aima_agent"),
+    ("Berapa jumlah armada kapal tanker PT Pertamina Trans Kontinental?", "aima_agent"),
+    ("Layanan pelayaran dan logistik laut PTK", "aima_agent"),
+    ("Siapa saja yang tergabung dalam usecase Jargas?", "difa_agent"),
+    ("Berapa sambungan rumah tangga jaringan gas Jargas?", "difa_agent"),
+    ("Progres pembangunan pipa jaringan gas kota", "difa_agent"),
+    ("Apa lembaga inspeksi yang melakukan inspeksi untuk DPPU Ahmad Yani?", "gino_agent"),
+    ("Kapan jadwal inspeksi DPPU berikutnya?", "gino_agent"),
+    ("Hasil temuan inspeksi depot pengisian avtur bandara", "gino_agent"),
+]
+
+class LocalRouter:
+    """
+    TF-IDF nearest-centroid classifier over logged routing decisions.
+
+    `route()` returns a routing dict when the best agent's cosine score is at
+    least `min_score` and beats the runner-up by `min_margin` (relative), and
+    None for ambiguous queries so the caller can ask the LLM orchestrator.
+
+    `learn()` only queues a decision. Every `refit_every` decisions the
+    model is refitted, and the decisions appended to `log_path` (when set),
+    in a worker thread; the new model replaces the old one when done, so
+    the event loop never waits for a refit or a file write.
+    """
+
+    def __init__(
+        self,
+        log_path: Optional[str] = ROUTER_LOG_PATH,
+        min_score: float = ROUTER_MIN_SCORE,
+        min_margin: float = ROUTER_MIN_MARGIN,
+        max_examples: int = ROUTER_MAX_EXAMPLES,
+        refit_every: int = ROUTER_REFIT_EVERY,
+    ):
+        self.log_path = log_path
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.max_examples = max_examples
+        self.refit_every = refit_every
+
+        self.examples: List[Tuple[str, str]] = list(SEED_EXAMPLES) + self._load_log()
+        self.idf: Dict[str, float] = {}
+        self.centroids: Dict[str, Dict[str, float]] = {}
+        self._unfitted: List[Tuple[str, str]] = []
+        self._refit: Optional[asyncio.Future] = None
+        self.fit()
+
+    def _load_log(self) -> List[Tuple[str, str]]:
+        if not self.log_path or not os.path.exists(self.log_path):
+            return []
+
+        examples = []
+        with open(self.log_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("query") and record.get("agent"):
+                    examples.append((record["query"], record["agent"]))
+        return examples[-self.max_examples:]
+
+    @staticmethod
+    def _tfidf(tokens: List[str], idf: Dict[str, float]) -> Dict[str, float]:
+        counts = Counter(t for t in tokens if t in idf)
+        vector = {t: (1 + math.log(c)) * idf[t] for t, c in counts.items()}
+        norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+        return {t: v / norm for t, v in vector.items()}
+
+    def _vector(self, tokens: List[str]) -> Dict[str, float]:
+        return self._tfidf(tokens, self.idf)
+
+    @classmethod
+    def _fit(cls, examples: List[Tuple[str, str]]) -> Tuple[Dict[str, float], Dict[str, Dict[str, float]]]:
+        """IDF weights and per-agent centroids for `examples`"""
+        docs = [(content_tokens(query), agent) for query, agent in examples]
+
+        df = Counter()
+        for tokens, _ in docs:
+            df.update(set(tokens))
+        n = len(docs)
+        idf = {t: math.log((1 + n) / (1 + c)) + 1 for t, c in df.items()}
+
+        sums: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        for tokens, agent in docs:
+            for t, v in cls._tfidf(tokens, idf).items():
+                sums[agent][t] += v
+
+        centroids = {}
+        for agent, vector in sums.items():
+            norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+            centroids[agent] = {t: v / norm for t, v in vector.items()}
+        return idf, centroids
+
+    def fit(self):
+        """Rebuild IDF weights and per-agent centroids from the examples (blocking)"""
+        self.idf, self.centroids = self._fit(self.examples)
+
+    def scores(self, query: str) -> List[Tuple[str, float]]:
+        """Cosine score of `query` against every agent, best first"""
+        vector = self._vector(content_tokens(query))
+        scored = [
+            (agent, sum(v * centroid.get(t, 0.0) for t, v in vector.items()))
+            for agent, centroid in self.centroids.items()
+        ]
+        return sorted(scored, key=lambda item: item[1], reverse=True)
+
+    def route(self, query: str, agents: Optional[dict] = None) -> Optional[dict]:
+        """Routing decision for confident queries, None otherwise"""
+        scored = [(a, s) for a, s in self.scores(query) if agents is None or a in agents]
+        if not scored:
+            return None
+
+        best_agent, best = scored[0]
+        runner_up = scored[1][1] if len(scored) > 1 else 0.0
+        if best < self.min_score or (best - runner_up) / best < self.min_margin:
+            return None
+        return {"agent": best_agent, "message": query}
+
+    def predict(self, query: str, agents: Optional[dict] = None, min_score: float = ROUTER_PREDICT_MIN_SCORE) -> Optional[str]:
+        """Most likely agent even when not confident enough to route, None without any signal"""
+        scored = [(a, s) for a, s in self.scores(query) if agents is None or a in agents]
+        if not scored or scored[0][1] < min_score:
+            return None
+        return scored[0][0]
+
+    def learn(self, query: str, agent: str):
+        """Queue an LLM routing decision; refits in the background every `refit_every` decisions"""
+        self._unfitted.append((query, agent))
+        if len(self._unfitted) >= self.refit_every and (self._refit is None or self._refit.done()):
+            self._start_refit()
+
+    def _start_refit(self):
+        learned, self._unfitted = self._unfitted, []
+        self.examples = (self.examples + learned)[-(self.max_examples + len(SEED_EXAMPLES)):]
+        examples = list(self.examples)
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._log(learned)
+            self.fit()
+            return
+        self._refit = loop.run_in_executor(None, self._refit_job, examples, learned)
+        self._refit.add_done_callback(self._refitted)
+
+    def _refit_job(self, examples: List[Tuple[str, str]], learned: List[Tuple[str, str]]):
+        self._log(learned)
+        return self._fit(examples)
+
+    def _refitted(self, future: asyncio.Future):
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            print(f"[ROUTER] Background refit failed: {future.exception()}")
+            return
+        self.idf, self.centroids = future.result()
+        if len(self._unfitted) >= self.refit_every:
+            self._start_refit()
+
+    def _log(self, learned: List[Tuple[str, str]]):
+        if not self.log_path:
+            return
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            for query, agent in learned:
+                f.write(json.dumps({"query": query, "agent": agent}, ensure_ascii=False) + "\n")
@@ -0,0 +1,201 @@
+from utils.startup import startup, enabled as startup_profile_enabled
+import os
+import json
+import asyncio
+from typing import Optional
+from aiohttp import web
+from agents.registry import default_registry
+from models.client import create_chat_agent
+from orchestrator import (
+    ORCHESTRATOR_INSTRUCTION, run_orchestration, create_routing_cache, create_session_store,
+    breaker_states, check_config
+)
+from router import LocalRouter, ROUTER_ENABLED
+from utils.config import load_config
+
+load_config()
+startup.mark("imports")
+
+SERVER_HOST = os.environ.get("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.environ.get("SERVER_PORT", "8080"))
+SERVER_MAX_INFLIGHT = int(os.environ.get("SERVER_MAX_INFLIGHT", "64"))
+SERVER_SHUTDOWN_TIMEOUT = float(os.environ.get("SERVER_SHUTDOWN_TIMEOUT", "30"))
+SERVER_SSE_HEARTBEAT = float(os.environ.get("SERVER_SSE_HEARTBEAT", "15"))
+SERVER_PRELOAD_AGENTS = os.environ.get("SERVER_PRELOAD_AGENTS", "false").lower() == "true"
+
+class ChatService:
+    """
+    HTTP front-end for the orchestrator.
+
+    One orchestrator, one set of agents (with their connection and
+    conversation pools), the router and the routing cache are shared by
+    every request. At most `max_inflight` orchestrations run at once; the
+    rest wait for a slot.
+
+    Requests carrying a `session_id` are multi-turn: earlier turns of the
+    session are given to the LLMs and the session keeps its DirectLine
+    conversations (see `run_orchestration`). Without one, every request is
+    independent.
+
+    Endpoints:
+        POST   /chat           {"query": ..., "direct": bool?, "session_id": str?}
+                               -> orchestration result as JSON
+        POST   /chat/stream    same body, answered as Server-Sent Events:
+                               `chunk` events ({"text": ...}) while the answer streams,
+                               then one `done` event with the orchestration result
+                               (or an `error` event)
+        DELETE /sessions/{id}  forget a session's history
+        GET    /health         status, circuit breaker states and session store stats
+    """
+
+    def __init__(self, max_inflight: int = SERVER_MAX_INFLIGHT, heartbeat: float = SERVER_SSE_HEARTBEAT):
+        self.max_inflight = max_inflight
+        self.heartbeat = heartbeat
+        self.orchestrator = None
+        self.agents = None
+        self.router: Optional[LocalRouter] = None
+        self.routing_cache = None
+        self.sessions = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/chat", self.chat)
+        app.router.add_post("/chat/stream", self.chat_stream)
+        app.router.add_delete("/sessions/{session_id}", self.end_session)
+        app.router.add_get("/health", self.health)
+        app.on_startup.append(self.start)
+        # Runs after in-flight requests have finished (or hit the shutdown timeout)
+        app.on_cleanup.append(self.close)
+        return app
+
+    async def start(self, app: web.Application):
+        """Startup hook: build the shared orchestrator and agent registry"""
+        self.agents = default_registry()
+        check_config(self.agents)
+        startup.mark("config")
+
+        self.orchestrator = create_chat_agent(ORCHESTRATOR_INSTRUCTION)
+        self.router = LocalRouter() if ROUTER_ENABLED else None
+        self.routing_cache = create_routing_cache()
+        self.sessions = create_session_store()
+        self._slots = asyncio.Semaphore(self.max_inflight)
+        startup.mark("orchestrator")
+
+        if SERVER_PRELOAD_AGENTS:
+            await self.agents.start(*self.agents)
+            startup.mark("agents preloaded")
+        print("✓ Agents registered!")
+        if startup_profile_enabled():
+            print(startup.report())
+
+    async def close(self, app: web.Application):
+        """Shutdown hook: release the agents' pools and the session store"""
+        await self.agents.close()
+        if self.sessions is not None:
+            self.sessions.close()
+
+    async def _request(self, request: web.Request) -> dict:
+        try:
+            body = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            raise web.HTTPBadRequest(text="Request body must be JSON")
+
+        query = str(body.get("query") or "").strip() if isinstance(body, dict) else ""
+        if not query:
+            raise web.HTTPBadRequest(text="Missing 'query'")
+        direct = body.get("direct")
+        if direct is not None and not isinstance(direct, bool):
+            raise web.HTTPBadRequest(text="'direct' must be true, false or null")
+        session_id = body.get("session_id")
+        return {
+            "query": query,
+            "direct": direct,
+            "session_id": str(session_id) if session_id else None,
+        }
+
+    async def _orchestrate(
+        self,
+        query: str,
+        direct: Optional[bool] = None,
+        session_id: Optional[str] = None,
+        on_chunk=None
+    ) -> dict:
+        async with self._slots:
+            return await run_orchestration(
+                self.orchestrator, self.agents, query,
+                router=self.router, routing_cache=self.routing_cache,
+                direct=direct, on_chunk=on_chunk,
+                sessions=self.sessions, session_id=session_id
+            )
+
+    async def chat(self, request: web.Request) -> web.Response:
+        params = await self._request(request)
+        result = await self._orchestrate(**params, on_chunk=lambda text: None)
+        return web.json_response(result, dumps=lambda obj: json.dumps(obj, ensure_ascii=False, default=str))
+
+    async def chat_stream(self, request: web.Request) -> web.StreamResponse:
+        params = await self._request(request)
+
+        response = web.StreamResponse(headers={
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        })
+        await response.prepare(request)
+
+        chunks: asyncio.Queue = asyncio.Queue()
+        task = asyncio.ensure_future(
+            self._orchestrate(**params, on_chunk=chunks.put_nowait)
+        )
+        task.add_done_callback(lambda _: chunks.put_nowait(None))
+
+        try:
+            while True:
+                try:
+                    text = await asyncio.wait_for(chunks.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing the connection while the backend thinks
+                    await response.write(b": keep-alive\n\n")
+                    continue
+                if text is None:
+                    break
+                await response.write(sse("chunk", {"text": text}))
+
+            try:
+                await response.write(sse("done", task.result()))
+            except Exception as e:
+                await response.write(sse("error", {"error": str(e)}))
+            await response.write_eof()
+        finally:
+            # Client went away (or the server is shutting down): stop working on its answer
+            if not task.done():
+                task.cancel()
+        return response
+
+    async def end_session(self, request: web.Request) -> web.Response:
+        if self.sessions is not None:
+            self.sessions.clear(request.match_info["session_id"])
+        return web.Response(status=204)
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "status": "ok",
+            "breakers": breaker_states(self.agents),
+            "sessions": self.sessions.stats() if self.sessions is not None else None,
+        })
+
+
+def sse(event: str, data) -> bytes:
+    """One Server-Sent Event"""
+    payload = json.dumps(data, ensure_ascii=False, default=str)
+    return f"event: {event}\ndata: {payload}\n\n".encode("utf-8")
+
+
+if __name__ == "__main__":
+    web.run_app(
+        ChatService().app(),
+        host=SERVER_HOST,
+        port=SERVER_PORT,
+        shutdown_timeout=SERVER_SHUTDOWN_TIMEOUT,
+    )
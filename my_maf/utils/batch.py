@@ -0,0 +1,60 @@
+import os
+import time
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable
+from utils.config import load_config
+
+load_config()
+
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "8"))
+
+async def as_completed(
+    queries: Iterable[str],
+    fn: Callable[[str], Awaitable[Any]],
+    concurrency: int = BATCH_CONCURRENCY,
+) -> AsyncIterator[dict]:
+    """
+    Run `fn` over `queries` with at most `concurrency` calls in flight and
+    yield each result as soon as it is ready.
+
+    Queries are pulled from the iterable lazily, so long or generated inputs
+    are fine. Results are dicts with `index`, `query`, `response`, `error`
+    (the exception, if `fn` raised) and `latency`. Closing the generator
+    early cancels whatever is still running.
+    """
+    queries = enumerate(queries)
+    pending = {}
+
+    async def timed(query: str):
+        start_time = time.monotonic()
+        try:
+            return await fn(query), None, time.monotonic() - start_time
+        except Exception as e:
+            return None, e, time.monotonic() - start_time
+
+    def fill():
+        while len(pending) < max(1, concurrency):
+            try:
+                index, query = next(queries)
+            except StopIteration:
+                return
+            pending[asyncio.ensure_future(timed(query))] = (index, query)
+
+    try:
+        fill()
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index, query = pending.pop(task)
+                response, error, latency = task.result()
+                yield {
+                    "index": index,
+                    "query": query,
+                    "response": response,
+                    "error": error,
+                    "latency": latency,
+                }
+            fill()
+    finally:
+        for task in pending:
+            task.cancel()
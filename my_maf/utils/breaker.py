@@ -0,0 +1,148 @@
+import os
+import time
+from collections import deque
+from typing import Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    """The backend's circuit is open; the call was rejected without being attempted"""
+
+
+def _env(name: str, key: str, default: str) -> str:
+    return os.environ.get(f"{name.upper()}_BREAKER_{key}", os.environ.get(f"BREAKER_{key}", default))
+
+
+class CircuitBreaker:
+    """
+    Per-backend circuit breaker driven by recent errors and latency.
+
+    Calls within the last `window` seconds are kept. Once there are at least
+    `min_calls`, the circuit opens when the error rate reaches `error_rate`
+    or the p95 latency reaches `latency_p95` seconds. After `cooldown`
+    seconds it lets `half_open_probes` trial calls through: a success closes
+    it again, a failure re-opens it.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: float = 60,
+        min_calls: int = 5,
+        error_rate: float = 0.5,
+        latency_p95: Optional[float] = None,
+        cooldown: float = 30,
+        half_open_probes: int = 1,
+    ):
+        self.name = name
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate
+        self.latency_p95_threshold = latency_p95
+        self.cooldown = cooldown
+        self.half_open_probes = half_open_probes
+
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self._probes = 0
+        self._calls: deque = deque()  # (timestamp, ok, latency)
+
+    @classmethod
+    def from_env(cls, name: str) -> "CircuitBreaker":
+        """Configured from `<NAME>_BREAKER_*`, falling back to `BREAKER_*`"""
+        latency = _env(name, "LATENCY_P95", "")
+        return cls(
+            name,
+            window=float(_env(name, "WINDOW", "60")),
+            min_calls=int(_env(name, "MIN_CALLS", "5")),
+            error_rate=float(_env(name, "ERROR_RATE", "0.5")),
+            latency_p95=float(latency) if latency else None,
+            cooldown=float(_env(name, "COOLDOWN", "30")),
+            half_open_probes=int(_env(name, "HALF_OPEN_PROBES", "1")),
+        )
+
+    def _prune(self):
+        cutoff = time.monotonic() - self.window
+        while self._calls and self._calls[0][0] < cutoff:
+            self._calls.popleft()
+
+    def available(self) -> bool:
+        """Whether a call would be let through right now (without taking a probe slot)"""
+        if self.state == OPEN:
+            return time.monotonic() - self.opened_at >= self.cooldown
+        if self.state == HALF_OPEN:
+            return self._probes < self.half_open_probes
+        return True
+
+    def acquire(self):
+        """Admit one call or raise CircuitOpenError"""
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+            self.state = HALF_OPEN
+            self._probes = 0
+            print(f"[BREAKER] {self.name} half-open, probing")
+
+        if self.state == OPEN or (self.state == HALF_OPEN and self._probes >= self.half_open_probes):
+            raise CircuitOpenError(f"{self.name} circuit is open")
+        if self.state == HALF_OPEN:
+            self._probes += 1
+
+    def release(self):
+        """A call admitted by acquire() ended without an outcome (e.g. cancelled)"""
+        if self.state == HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+    def record(self, ok: bool, latency: float):
+        if self.state == HALF_OPEN:
+            self._probes = max(self._probes - 1, 0)
+            if ok:
+                self._close()
+            else:
+                self._open()
+            return
+
+        self._calls.append((time.monotonic(), ok, latency))
+        self._prune()
+        if self.state == CLOSED and len(self._calls) >= self.min_calls and self._tripped():
+            self._open()
+
+    def _tripped(self) -> bool:
+        if self.error_rate() >= self.error_rate_threshold:
+            return True
+        p95 = self.latency_percentile(95)
+        return self.latency_p95_threshold is not None and p95 is not None and p95 >= self.latency_p95_threshold
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        print(f"[BREAKER] {self.name} opened")
+
+    def _close(self):
+        self.state = CLOSED
+        self._calls.clear()
+        print(f"[BREAKER] {self.name} closed")
+
+    def error_rate(self) -> float:
+        self._prune()
+        if not self._calls:
+            return 0.0
+        return sum(1 for _, ok, _ in self._calls if not ok) / len(self._calls)
+
+    def latency_percentile(self, q: float) -> Optional[float]:
+        self._prune()
+        latencies = sorted(latency for _, _, latency in self._calls)
+        if not latencies:
+            return None
+        return latencies[min(int(round(q / 100 * (len(latencies) - 1))), len(latencies) - 1)]
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "available": self.available(),
+            "calls": len(self._calls),
+            "error_rate": self.error_rate(),
+            "p50": self.latency_percentile(50),
+            "p95": self.latency_percentile(95),
+            "p99": self.latency_percentile(99),
+        }
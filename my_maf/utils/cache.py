@@ -0,0 +1,113 @@
+import json
+import time
+import sqlite3
+from collections import OrderedDict
+from typing import Any, Optional
+
+class TTLCache:
+    """
+    Size-bounded LRU cache whose entries expire after `ttl` seconds.
+
+    With `path`, entries are also written to a SQLite table so they survive
+    restarts; unexpired rows are loaded back on startup. Values must be JSON
+    serialisable when persistence is enabled.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: float = 3600,
+        path: Optional[str] = None,
+        table: str = "cache",
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.table = table
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.commit()
+            self._load()
+
+    def _load(self):
+        now = time.time()
+        self._db.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,))
+        self._db.commit()
+        rows = self._db.execute(
+            f"SELECT key, value, expires_at FROM {self.table} ORDER BY expires_at DESC LIMIT ?",
+            (self.max_size,)
+        ).fetchall()
+        for key, value, expires_at in reversed(rows):
+            self._data[key] = (expires_at, json.loads(value))
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= time.time():
+            if entry is not None:
+                self.invalidate(key)
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+
+        evicted = []
+        while len(self._data) > self.max_size:
+            evicted.append(self._data.popitem(last=False)[0])
+
+        if self._db is not None:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), expires_at)
+            )
+            self._db.executemany(f"DELETE FROM {self.table} WHERE key = ?", [(k,) for k in evicted])
+            self._db.commit()
+
+    def invalidate(self, key: str):
+        self._data.pop(key, None)
+        if self._db is not None:
+            self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._db.commit()
+
+    def invalidate_prefix(self, prefix: str):
+        for key in [k for k in self._data if k.startswith(prefix)]:
+            self._data.pop(key, None)
+        if self._db is not None:
+            self._db.execute(
+                f"DELETE FROM {self.table} WHERE substr(key, 1, ?) = ?", (len(prefix), prefix)
+            )
+            self._db.commit()
+
+    def clear(self):
+        self._data.clear()
+        if self._db is not None:
+            self._db.execute(f"DELETE FROM {self.table}")
+            self._db.commit()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
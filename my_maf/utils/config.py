@@ -0,0 +1,35 @@
+import os
+from typing import Iterable, List
+
+_loaded = False
+
+class ConfigError(Exception):
+    """Required configuration is missing or invalid"""
+
+
+def load_config():
+    """
+    Load `.env` into the environment, once per process
+
+    Every module that reads settings at import time calls this first, so
+    the file is parsed once no matter which module is imported first.
+    Variables already set in the environment win over `.env`.
+    """
+    global _loaded
+    if not _loaded:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _loaded = True
+
+
+def missing(names: Iterable[str]) -> List[str]:
+    """The settings among `names` that are unset or empty"""
+    load_config()
+    return [name for name in names if not os.environ.get(name)]
+
+
+def require(*names: str):
+    """Raise ConfigError listing every setting among `names` that is missing"""
+    absent = missing(names)
+    if absent:
+        raise ConfigError(f"Missing required settings: {', '.join(absent)}")
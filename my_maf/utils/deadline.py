@@ -0,0 +1,83 @@
+import time
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Optional, TypeVar
+
+T = TypeVar("T")
+
+class DeadlineExceeded(TimeoutError):
+    """The request-wide deadline expired"""
+
+
+class Deadline:
+    """
+    Absolute end time for one request, shared by everything it calls.
+
+    `scope()` makes it the current deadline for the calling task and every
+    task created from it, so HTTP, websocket and polling steps deep in the
+    tools can cap their own timeouts with `remaining_or()`.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def cap(self, timeout: Optional[float]) -> float:
+        """`timeout` limited to the time left (the time left when `timeout` is None)"""
+        remaining = self.remaining()
+        return remaining if timeout is None else min(timeout, remaining)
+
+    @contextmanager
+    def scope(self):
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    @staticmethod
+    def current() -> Optional["Deadline"]:
+        return _current.get()
+
+
+_current: ContextVar[Optional[Deadline]] = ContextVar("deadline", default=None)
+
+
+@contextmanager
+def detached():
+    """Run the enclosed code without a deadline (background work that outlives requests)"""
+    token = _current.set(None)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def remaining_or(timeout: Optional[float]) -> Optional[float]:
+    """`timeout` capped by the current deadline, if there is one"""
+    deadline = _current.get()
+    return timeout if deadline is None else deadline.cap(timeout)
+
+
+async def within_deadline(aw: Awaitable[T], timeout: Optional[float] = None) -> T:
+    """Await `aw`, cancelling it when `timeout` or the current deadline runs out"""
+    limit = remaining_or(timeout)
+    if limit is not None and limit <= 0:
+        if asyncio.iscoroutine(aw):
+            aw.close()
+        raise DeadlineExceeded("deadline expired")
+    try:
+        return await asyncio.wait_for(aw, limit)
+    except asyncio.TimeoutError:
+        deadline = _current.get()
+        if deadline is not None and deadline.expired:
+            raise DeadlineExceeded("deadline expired") from None
+        raise
@@ -0,0 +1,853 @@
+import os
+import time
+import asyncio
+import aiohttp
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional, Tuple
+from utils.http import SessionPool, session_pool, client_timeout
+from utils.deadline import detached, remaining_or, within_deadline
+from utils.tracing import tracer
+from utils.config import load_config
+
+load_config()
+
+DIRECTLINE_TOKEN_TTL = float(os.environ.get("DIRECTLINE_TOKEN_TTL", "1800"))
+DIRECTLINE_TOKEN_REFRESH_MARGIN = float(os.environ.get("DIRECTLINE_TOKEN_REFRESH_MARGIN", "300"))
+# conversation: a fresh token per conversation | shared: one cached token (only for endpoints issuing unscoped tokens)
+DIRECTLINE_TOKEN_SCOPE = os.environ.get("DIRECTLINE_TOKEN_SCOPE", "conversation")
+DIRECTLINE_POOL_SIZE = int(os.environ.get("DIRECTLINE_POOL_SIZE", "2"))
+DIRECTLINE_CONV_MAX_AGE = float(os.environ.get("DIRECTLINE_CONV_MAX_AGE", "1500"))
+DIRECTLINE_CONV_MAX_TURNS = int(os.environ.get("DIRECTLINE_CONV_MAX_TURNS", "20"))
+DIRECTLINE_ISOLATE_USERS = os.environ.get("DIRECTLINE_ISOLATE_USERS", "true").lower() == "true"
+DIRECTLINE_MAX_USER_CONVERSATIONS = int(os.environ.get("DIRECTLINE_MAX_USER_CONVERSATIONS", "256"))
+DIRECTLINE_CONV_MAX_INFLIGHT = int(os.environ.get("DIRECTLINE_CONV_MAX_INFLIGHT", "1"))
+DIRECTLINE_POLL_MIN_INTERVAL = float(os.environ.get("DIRECTLINE_POLL_MIN_INTERVAL", "0.5"))
+DIRECTLINE_POLL_MAX_INTERVAL = float(os.environ.get("DIRECTLINE_POLL_MAX_INTERVAL", "15"))
+DIRECTLINE_POLL_TIMEOUT = float(os.environ.get("DIRECTLINE_POLL_TIMEOUT", "240"))
+DIRECTLINE_WS_TIMEOUT = float(os.environ.get("DIRECTLINE_WS_TIMEOUT", "60"))
+DIRECTLINE_WS_RETRY_AFTER = float(os.environ.get("DIRECTLINE_WS_RETRY_AFTER", "60"))
+DIRECTLINE_TRANSPORT = os.environ.get("DIRECTLINE_TRANSPORT", "ws")
+DIRECTLINE_HTTP_TIMEOUT = float(os.environ.get("DIRECTLINE_HTTP_TIMEOUT", "30"))
+
+DIRECTLINE_USER_ID = "azure-agent"
+
+class TokenManager:
+    """
+    Issues DirectLine tokens for one backend's conversations.
+
+    Tokens from the DirectLine generate endpoint and Copilot Studio token
+    endpoints are bound to the conversation they start: starting another
+    conversation with the same token reopens the first one. So by default
+    (`scope="conversation"`) `for_conversation()` fetches a fresh token for
+    every conversation; pools open theirs while warming up, off the request
+    path.
+
+    `scope="shared"` is only for token endpoints that issue unscoped tokens:
+    one token is cached, refreshed in the background `refresh_margin`
+    seconds before it expires, and concurrent callers that find no valid
+    token share a single in-flight fetch.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        secret: str,
+        token_url: str,
+        http: Optional[SessionPool] = None,
+        ttl: float = DIRECTLINE_TOKEN_TTL,
+        refresh_margin: float = DIRECTLINE_TOKEN_REFRESH_MARGIN,
+        scope: str = DIRECTLINE_TOKEN_SCOPE,
+    ):
+        if scope not in ("conversation", "shared"):
+            raise ValueError(f"Unknown DirectLine token scope: {scope}")
+
+        self.name = name
+        self.secret = secret
+        self.token_url = token_url
+        self.http = http or session_pool
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.scope = scope
+
+        self.token: Optional[str] = None
+        self.expires_at = 0.0
+        self._inflight: Optional[asyncio.Future] = None
+        self._refresher: Optional[asyncio.Task] = None
+
+    def valid(self) -> bool:
+        return self.token is not None and time.monotonic() < self.expires_at - self.refresh_margin
+
+    async def get(self) -> str:
+        """Return a valid token, fetching one if needed"""
+        if not self.valid():
+            await self.refresh()
+        self._ensure_refresher()
+        return self.token
+
+    async def refresh(self) -> str:
+        """Fetch a new token; concurrent callers join the same request"""
+        if self._inflight is None:
+            self._inflight = asyncio.ensure_future(self._fetch())
+            self._inflight.add_done_callback(self._clear_inflight)
+        return await within_deadline(asyncio.shield(self._inflight))
+
+    def _clear_inflight(self, _):
+        self._inflight = None
+
+    async def for_conversation(self) -> Tuple[str, float]:
+        """A token to start one new conversation with, and when it expires (monotonic time)"""
+        if self.scope == "shared":
+            token = await self.get()
+            return token, self.expires_at
+
+        token_res = await within_deadline(self._request())
+        return token_res["token"], time.monotonic() + float(token_res.get("expires_in") or self.ttl)
+
+    async def _fetch(self) -> str:
+        # Shared by every caller, so it isn't bound to any one request's deadline
+        with detached():
+            token_res = await self._request()
+
+        self.token = token_res["token"]
+        self.expires_at = time.monotonic() + float(token_res.get("expires_in") or self.ttl)
+        return self.token
+
+    async def _request(self) -> dict:
+        with tracer.span("directline.token", backend=self.name):
+            session = await self.http.get(self.name)
+            async with session.get(
+                self.token_url,
+                headers={
+                    "Authorization": f"Bearer {self.secret}",
+                    "Content-Type": "application/json"
+                },
+                timeout=client_timeout(DIRECTLINE_HTTP_TIMEOUT)
+            ) as resp:
+                resp.raise_for_status()
+                return await resp.json()
+
+    def _ensure_refresher(self):
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.ensure_future(self._refresh_loop())
+
+    async def _refresh_loop(self):
+        with detached():
+            await self._refresh_forever()
+
+    async def _refresh_forever(self):
+        while True:
+            delay = self.expires_at - self.refresh_margin - time.monotonic()
+            await asyncio.sleep(max(delay, 1.0))
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[{self.name.upper()} TOOL - TOKEN] Background refresh failed: {e}")
+                await asyncio.sleep(5)
+
+    async def close(self):
+        """Stop the background refresher"""
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._refresher = None
+
+
+def find_reply(activities: List[dict], activity_id: Optional[str], from_id: str = DIRECTLINE_USER_ID) -> Optional[str]:
+    """
+    Return the bot's answer to `activity_id`, or None if it hasn't arrived.
+
+    Prefers activities whose `replyToId` matches; for bots that don't set it,
+    falls back to the first bot message posted after our activity. Like
+    `StreamDispatcher`, the first message of a multi-message reply is the
+    answer, so both transports give the same one.
+    """
+    replies = [
+        a for a in activities
+        if a.get("type", "message") == "message"
+        and a.get("from", {}).get("id") != from_id
+        and a.get("text")
+    ]
+    matched = [a for a in replies if activity_id and a.get("replyToId") == activity_id]
+    if matched:
+        return matched[0]["text"]
+
+    ids = [a.get("id") for a in activities]
+    if activity_id in ids:
+        reply_ids = {id(a) for a in replies}
+        later = activities[ids.index(activity_id) + 1:]
+        later = [a for a in later if id(a) in reply_ids and not a.get("replyToId")]
+        if later:
+            return later[0]["text"]
+    return None
+
+
+class LatencyTracker:
+    """Rolling window of how long a backend took to answer"""
+
+    def __init__(self, window: int = 200):
+        self.samples: deque = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(int(round(q / 100 * (len(ordered) - 1))), len(ordered) - 1)
+        return ordered[index]
+
+
+def poll_delays(
+    latency: LatencyTracker,
+    min_interval: float = DIRECTLINE_POLL_MIN_INTERVAL,
+    max_interval: float = DIRECTLINE_POLL_MAX_INTERVAL,
+):
+    """
+    Yield sleep intervals between polls.
+
+    Without history, back off from 1s. With history, sleep until shortly
+    before the backend's p50, poll densely until its p90, then back off.
+    """
+    p50 = latency.percentile(50)
+    if p50 is None:
+        delay = 1.0
+        while True:
+            yield delay
+            delay = min(delay * 1.5, max_interval)
+
+    waited = max(p50 * 0.75, min_interval)
+    yield waited
+
+    step = max(p50 * 0.1, min_interval)
+    dense_until = max(latency.percentile(90), p50 * 1.5)
+    while waited < dense_until:
+        yield step
+        waited += step
+
+    delay = step
+    while True:
+        delay = min(delay * 2, max_interval)
+        yield delay
+
+
+async def poll_reply(
+    session,
+    url: str,
+    conv: "Conversation",
+    activity_id: Optional[str],
+    latency: LatencyTracker,
+    timeout: float = DIRECTLINE_POLL_TIMEOUT,
+    name: str = "directline",
+) -> str:
+    """
+    Poll `conv` for the reply to `activity_id` using its watermark.
+
+    Each request only returns activities newer than the last one seen, and
+    polling stops as soon as a correlated reply shows up. Raises TimeoutError
+    once `timeout` seconds have passed without an answer.
+    """
+    start_time = time.monotonic()
+    seen: List[dict] = []
+
+    with tracer.span("directline.poll", backend=name) as span:
+        for attempt, delay in enumerate(poll_delays(latency)):
+            remaining = timeout - (time.monotonic() - start_time)
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(delay, remaining))
+
+            params = {"watermark": conv.watermark} if conv.watermark else None
+            async with session.get(
+                url + f'/{conv.id}/activities',
+                headers={"Authorization": f"Bearer {conv.token}"},
+                params=params,
+                timeout=client_timeout(min(DIRECTLINE_HTTP_TIMEOUT, remaining))
+            ) as resp:
+                resp.raise_for_status()
+                data = await resp.json()
+
+            conv.watermark = data.get("watermark", conv.watermark)
+            seen.extend(data.get("activities", []))
+            span.set(polls=attempt + 1, activities=len(seen))
+
+            response = find_reply(seen, activity_id)
+            if response:
+                latency.record(time.monotonic() - start_time)
+                return response
+
+        raise TimeoutError(f"{name} did not reply within {timeout:.0f} sec")
+
+
+class StreamDispatcher:
+    """
+    Reads one conversation's websocket and routes bot replies to callers.
+
+    Callers `expect()` the id of the activity they posted and await the
+    returned future; the reader resolves it with the first bot message whose
+    `replyToId` matches. Bot messages without `replyToId` go to the oldest of
+    our activities that hasn't been answered yet. Replies that arrive before
+    the caller registers (the post response can lose the race against the
+    stream) are buffered, so several questions can share one socket.
+
+    Bots that stream their answer send it as `typing` activities carrying
+    the text so far before the final message; those are passed to the
+    caller's `on_partial` callback (status-only "informative" updates are
+    not).
+    """
+
+    MAX_UNCLAIMED = 100
+
+    def __init__(self, ws, name: str = "directline", from_id: str = DIRECTLINE_USER_ID):
+        self.ws = ws
+        self.name = name
+        self.from_id = from_id
+        self.watermark: Optional[str] = None
+
+        self._waiters: Dict[str, asyncio.Future] = {}
+        self._partials: Dict[str, Callable[[str], None]] = {}
+        self._unclaimed: OrderedDict = OrderedDict()
+        self._unanswered: deque = deque()
+        self._reader = asyncio.ensure_future(self._read())
+
+    @property
+    def closed(self) -> bool:
+        return self.ws.closed or self._reader.done()
+
+    def expect(self, activity_id: str, on_partial: Optional[Callable[[str], None]] = None) -> asyncio.Future:
+        """Register interest in the reply to `activity_id`"""
+        future = asyncio.get_running_loop().create_future()
+        if activity_id in self._unclaimed:
+            future.set_result(self._unclaimed.pop(activity_id))
+        elif self.closed:
+            future.set_exception(ConnectionError(f"{self.name} stream is closed"))
+        else:
+            self._waiters[activity_id] = future
+            if on_partial is not None:
+                self._partials[activity_id] = on_partial
+        return future
+
+    async def wait(
+        self,
+        activity_id: str,
+        timeout: Optional[float] = None,
+        on_partial: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """Wait for the bot's reply text to `activity_id`, passing streamed partial text to `on_partial`"""
+        future = self.expect(activity_id, on_partial)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._waiters.pop(activity_id, None)
+            self._partials.pop(activity_id, None)
+
+    async def _read(self):
+        error: Exception = ConnectionError(f"{self.name} stream closed")
+        try:
+            async for msg in self.ws:
+                if msg.type == aiohttp.WSMsgType.ERROR:
+                    error = ConnectionError(f"{self.name} stream error: {self.ws.exception()}")
+                    break
+                # DirectLine sends empty TEXT frames as keep-alives
+                if msg.type != aiohttp.WSMsgType.TEXT or not msg.data:
+                    continue
+
+                payload = msg.json()
+                self.watermark = payload.get("watermark", self.watermark)
+                for activity in payload.get("activities", []):
+                    self._dispatch(activity)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = e
+        finally:
+            for future in self._waiters.values():
+                if not future.done():
+                    future.set_exception(error)
+            self._waiters.clear()
+            self._partials.clear()
+
+    def _dispatch(self, activity: dict):
+        if activity.get("from", {}).get("id") == self.from_id:
+            if activity.get("id"):
+                self._unanswered.append(activity["id"])
+            return
+
+        if activity.get("type") == "typing":
+            self._partial(activity)
+            return
+
+        # Events and empty messages are not answers
+        if activity.get("type", "message") != "message" or not activity.get("text"):
+            return
+
+        reply_to = activity.get("replyToId")
+        if reply_to is None:
+            if not self._unanswered:
+                return  # e.g. a welcome message
+            reply_to = self._unanswered[0]
+
+        if reply_to in self._unanswered:
+            self._unanswered.remove(reply_to)
+        elif reply_to in self._unclaimed:
+            return  # keep the first message of a multi-message reply
+
+        future = self._waiters.pop(reply_to, None)
+        if future is not None and not future.done():
+            future.set_result(activity["text"])
+        else:
+            self._unclaimed[reply_to] = activity["text"]
+            while len(self._unclaimed) > self.MAX_UNCLAIMED:
+                self._unclaimed.popitem(last=False)
+
+    def _partial(self, activity: dict):
+        channel_data = activity.get("channelData") or {}
+        if not activity.get("text") or channel_data.get("streamType") == "informative":
+            return
+        reply_to = activity.get("replyToId") or (self._unanswered[0] if self._unanswered else None)
+        callback = self._partials.get(reply_to)
+        if callback is not None:
+            callback(activity["text"])
+
+    async def close(self):
+        self._reader.cancel()
+        try:
+            await self._reader
+        except (asyncio.CancelledError, Exception):
+            pass
+        if not self.ws.closed:
+            await self.ws.close()
+
+
+class Conversation:
+    """An open DirectLine conversation handed out by ConversationPool"""
+
+    def __init__(
+        self,
+        conv_id: str,
+        token: str,
+        stream_url: Optional[str] = None,
+        expires_at: float = float("inf")
+    ):
+        self.id = conv_id
+        self.token = token
+        self.expires_at = expires_at
+        self.stream_url = stream_url
+        self.stream: Optional[StreamDispatcher] = None
+        self.user_id: Optional[str] = None
+        self.watermark: Optional[str] = None
+        self.turns = 0
+        self.inflight = 0
+        self.retiring = False
+        self.created_at = time.monotonic()
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.created_at
+
+    @property
+    def headers(self) -> dict:
+        return {
+            "Authorization": f"Bearer {self.token}",
+            "Content-Type": "application/json"
+        }
+
+
+class ConversationPool:
+    """
+    Keeps DirectLine conversations open ahead of time for one backend.
+
+    `acquire()` hands out a warm conversation so only the activity post and
+    the wait for the answer stay on the request path; `release()` recycles it
+    or retires it once it exceeds `max_age` seconds or `max_turns` turns.
+    With `isolate_users`, a conversation is only ever reused by the user it
+    was first handed to, and anonymous callers get single-use conversations;
+    at most `max_users` users keep a conversation between turns, the least
+    recently active ones being retired first.
+    With `open_stream`, each conversation's `streamUrl` websocket is opened
+    while warming (DirectLine drops stream URLs not connected within ~60s)
+    and read by a StreamDispatcher; `max_inflight` > 1 then lets concurrent
+    callers share a conversation when users are not isolated.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        url: str,
+        tokens: TokenManager,
+        http: Optional[SessionPool] = None,
+        size: int = DIRECTLINE_POOL_SIZE,
+        max_age: float = DIRECTLINE_CONV_MAX_AGE,
+        max_turns: int = DIRECTLINE_CONV_MAX_TURNS,
+        isolate_users: bool = DIRECTLINE_ISOLATE_USERS,
+        max_users: int = DIRECTLINE_MAX_USER_CONVERSATIONS,
+        open_stream: bool = False,
+        max_inflight: int = DIRECTLINE_CONV_MAX_INFLIGHT,
+    ):
+        self.name = name
+        self.url = url
+        self.tokens = tokens
+        self.http = http or session_pool
+        self.size = size
+        self.max_age = max_age
+        self.max_turns = max_turns
+        self.isolate_users = isolate_users
+        self.max_users = max_users
+        self.open_stream = open_stream
+        self.max_inflight = max_inflight if open_stream else 1
+
+        self._idle: deque = deque()
+        self._shared: List[Conversation] = []
+        self._by_user: OrderedDict = OrderedDict()
+        self._warming: set = set()
+        self._closed = False
+
+    def _usable(self, conv: Conversation) -> bool:
+        if conv.age >= self.max_age or conv.turns >= self.max_turns:
+            return False
+        # Retired rather than refreshed: a replacement is already warm in the pool
+        if time.monotonic() >= conv.expires_at - self.tokens.refresh_margin:
+            return False
+        if conv.retiring or (conv.stream is not None and conv.stream.closed):
+            return False
+        return True
+
+    async def open(self) -> Conversation:
+        """Start a new conversation (and its stream, if enabled)"""
+        token, expires_at = await self.tokens.for_conversation()
+
+        with tracer.span("directline.conversation", backend=self.name, stream=self.open_stream):
+            session = await self.http.get(self.name)
+            async with session.post(
+                self.url,
+                headers={
+                    "Authorization": f"Bearer {token}",
+                    "Content-Type": "application/json"
+                },
+                timeout=client_timeout(DIRECTLINE_HTTP_TIMEOUT)
+            ) as resp:
+                resp.raise_for_status()
+                conv_res = await resp.json()
+
+            if conv_res.get("expires_in"):
+                expires_at = time.monotonic() + float(conv_res["expires_in"])
+            conv = Conversation(
+                conv_res["conversationId"],
+                conv_res.get("token", token),
+                conv_res.get("streamUrl"),
+                expires_at,
+            )
+            if self.open_stream and conv.stream_url:
+                ws = await within_deadline(
+                    session.ws_connect(conv.stream_url, heartbeat=30), DIRECTLINE_HTTP_TIMEOUT
+                )
+                conv.stream = StreamDispatcher(ws, name=self.name)
+
+        return conv
+
+    async def acquire(self, user_id: Optional[str] = None) -> Conversation:
+        """Hand out a warm conversation, opening one if the pool is empty"""
+        conv = None
+        if user_id is not None and self.isolate_users:
+            conv = self._by_user.pop(user_id, None)
+            if conv is not None and not self._usable(conv):
+                await self._retire(conv)
+                conv = None
+
+        if conv is None and not self.isolate_users and self.max_inflight > 1:
+            for candidate in self._shared:
+                if candidate.inflight < self.max_inflight and self._usable(candidate):
+                    conv = candidate
+                    break
+
+        while conv is None and self._idle:
+            candidate = self._idle.popleft()
+            if self._usable(candidate):
+                conv = candidate
+            else:
+                await self._retire(candidate)
+
+        if conv is None:
+            conv = await self.open()
+
+        if conv.user_id is None:
+            conv.user_id = user_id
+        conv.inflight += 1
+        if self.max_inflight > 1 and conv not in self._shared:
+            self._shared.append(conv)
+        self._replenish()
+        return conv
+
+    async def release(self, conv: Conversation, healthy: bool = True):
+        """Return a conversation after a turn; recycle or retire it"""
+        conv.turns += 1
+        conv.inflight -= 1
+        if not healthy:
+            conv.retiring = True
+        if conv.inflight > 0:
+            return
+        if conv in self._shared:
+            self._shared.remove(conv)
+
+        if self._closed or not self._usable(conv):
+            await self._retire(conv)
+        elif not self.isolate_users:
+            self._idle.append(conv)
+        elif conv.user_id is not None:
+            previous = self._by_user.pop(conv.user_id, None)
+            if previous is not None and previous is not conv:
+                await self._retire(previous)
+            self._by_user[conv.user_id] = conv
+            while len(self._by_user) > self.max_users:
+                await self._retire(self._by_user.popitem(last=False)[1])
+        else:
+            await self._retire(conv)
+
+    async def _retire(self, conv: Conversation):
+        if conv.stream is not None:
+            await conv.stream.close()
+
+    def _replenish(self):
+        missing = self.size - len(self._idle) - len(self._warming)
+        for _ in range(max(missing, 0)):
+            task = asyncio.ensure_future(self._warm_one())
+            self._warming.add(task)
+            task.add_done_callback(self._warming.discard)
+
+    async def _warm_one(self):
+        try:
+            # Warm-ups outlive the request that triggered them
+            with detached():
+                conv = await self.open()
+        except Exception as e:
+            print(f"[{self.name.upper()} TOOL - POOL] Failed to pre-open conversation: {e}")
+            return
+        if self._closed:
+            await self._retire(conv)
+        else:
+            self._idle.append(conv)
+
+    async def start(self):
+        """Startup hook: fill the pool"""
+        self._closed = False
+        self._replenish()
+        if self._warming:
+            await asyncio.gather(*self._warming, return_exceptions=True)
+
+    async def close(self):
+        """Shutdown hook: cancel warm-ups and close every conversation"""
+        self._closed = True
+        for task in list(self._warming):
+            task.cancel()
+        conversations = list(self._idle) + list(self._by_user.values()) + self._shared
+        self._idle.clear()
+        self._shared = []
+        self._by_user.clear()
+        for conv in conversations:
+            await self._retire(conv)
+
+
+class StreamLost(ConnectionError):
+    """The websocket failed after the question was posted: its reply has to be polled for, not asked again"""
+
+    def __init__(self, conv: Conversation, since: Optional[str], activity_id: Optional[str], error: Exception):
+        super().__init__(str(error))
+        self.conv = conv
+        self.since = since
+        self.activity_id = activity_id
+
+
+class DirectLineBackend:
+    """
+    One DirectLine bot: token cache, conversation pools and transport.
+
+    `transport="ws"` waits for answers on the conversation's stream and, with
+    `fallback`, switches to polling when the socket fails: a question that
+    was already posted has its reply polled for in the same conversation,
+    one that wasn't is asked over polling (and polling is kept for
+    `ws_retry_after` seconds before trying the socket again). `transport="poll"` only polls. Every step is capped by the
+    current request deadline. Timeouts are raised as TimeoutError; every
+    other failure propagates to the caller.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        secret: str,
+        token_url: str,
+        url: str,
+        transport: str = DIRECTLINE_TRANSPORT,
+        fallback: bool = True,
+        http: Optional[SessionPool] = None,
+        ws_timeout: float = DIRECTLINE_WS_TIMEOUT,
+        poll_timeout: float = DIRECTLINE_POLL_TIMEOUT,
+        ws_retry_after: float = DIRECTLINE_WS_RETRY_AFTER,
+        token_scope: str = DIRECTLINE_TOKEN_SCOPE,
+    ):
+        if transport not in ("ws", "poll"):
+            raise ValueError(f"Unknown DirectLine transport: {transport}")
+
+        self.name = name
+        self.url = url
+        self.transport = transport
+        self.fallback = fallback
+        self.http = http or session_pool
+        self.ws_timeout = ws_timeout
+        self.poll_timeout = poll_timeout
+        self.ws_retry_after = ws_retry_after
+
+        self.tokens = TokenManager(name, secret, token_url, http=self.http, scope=token_scope)
+        self.latency = LatencyTracker()
+        self.stream_pool = ConversationPool(
+            name, url, self.tokens, http=self.http, open_stream=True,
+            size=DIRECTLINE_POOL_SIZE if transport == "ws" else 0,
+        )
+        self.poll_pool = ConversationPool(
+            name, url, self.tokens, http=self.http, open_stream=False,
+            size=DIRECTLINE_POOL_SIZE if transport == "poll" else 0,
+        )
+        self._ws_disabled_until = 0.0
+
+    @classmethod
+    def from_env(cls, prefix: str, **kwargs) -> "DirectLineBackend":
+        """Build a backend from `<PREFIX>_SECRET`, `_TOKEN_URL`, `_URL`, `_TRANSPORT` and `_TOKEN_SCOPE`"""
+        kwargs.setdefault("transport", os.environ.get(f"{prefix}_TRANSPORT", DIRECTLINE_TRANSPORT))
+        kwargs.setdefault("token_scope", os.environ.get(f"{prefix}_TOKEN_SCOPE", DIRECTLINE_TOKEN_SCOPE))
+        return cls(
+            prefix.lower(),
+            os.environ[f"{prefix}_SECRET"],
+            os.environ[f"{prefix}_TOKEN_URL"],
+            os.environ[f"{prefix}_URL"],
+            **kwargs,
+        )
+
+    def _use_ws(self) -> bool:
+        return self.transport == "ws" and time.monotonic() >= self._ws_disabled_until
+
+    async def ask(
+        self,
+        message: str,
+        user_id: Optional[str] = None,
+        on_partial: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """
+        Send `message` to the bot and return its answer
+
+        Over the websocket, the text so far of a bot that streams its answer
+        is passed to `on_partial` while it is being written; the returned
+        answer supersedes it.
+        """
+        if not self._use_ws():
+            return await self._ask_poll(message, user_id)
+
+        try:
+            return await self._ask_ws(message, user_id, on_partial)
+        except TimeoutError:
+            raise
+        except Exception as e:
+            if not self.fallback:
+                raise
+            print(f"[{self.name.upper()} TOOL - WS] Stream failed ({e}), falling back to polling")
+            self._ws_disabled_until = time.monotonic() + self.ws_retry_after
+            if isinstance(e, StreamLost):
+                return await self._poll_posted(e)
+            return await self._ask_poll(message, user_id)
+
+    async def _post(self, conv: Conversation, message: str) -> Optional[str]:
+        with tracer.span("directline.post", backend=self.name):
+            session = await self.http.get(self.name)
+            async with session.post(
+                self.url + f'/{conv.id}/activities',
+                headers=conv.headers,
+                json={
+                    "type": "message",
+                    "from": {"id": DIRECTLINE_USER_ID},
+                    "text": message
+                },
+                timeout=client_timeout(DIRECTLINE_HTTP_TIMEOUT)
+            ) as resp:
+                resp.raise_for_status()
+                activity_id = (await resp.json()).get("id")
+
+        return activity_id
+
+    async def _ask_ws(
+        self,
+        message: str,
+        user_id: Optional[str],
+        on_partial: Optional[Callable[[str], None]] = None
+    ) -> str:
+        conv = await self.stream_pool.acquire(user_id)
+        healthy = False
+        try:
+            if conv.stream is None:
+                raise ConnectionError(f"{self.name} conversation has no stream")
+
+            since = conv.stream.watermark
+            activity_id = await self._post(conv, message)
+
+            try:
+                with tracer.span("directline.ws_wait", backend=self.name) as span:
+                    response = await conv.stream.wait(
+                        activity_id, timeout=remaining_or(self.ws_timeout), on_partial=on_partial
+                    )
+                    span.set(length=len(response))
+            except TimeoutError:
+                raise
+            except Exception as e:
+                raise StreamLost(conv, since, activity_id, e) from e
+            self.latency.record(span.duration)
+            healthy = True
+            return response
+        finally:
+            await self.stream_pool.release(conv, healthy=healthy)
+
+    async def _ask_poll(self, message: str, user_id: Optional[str]) -> str:
+        conv = await self.poll_pool.acquire(user_id)
+        healthy = False
+        try:
+            activity_id = await self._post(conv, message)
+
+            session = await self.http.get(self.name)
+            response = await poll_reply(
+                session, self.url, conv, activity_id, self.latency,
+                timeout=remaining_or(self.poll_timeout), name=self.name
+            )
+            healthy = True
+            return response
+        finally:
+            await self.poll_pool.release(conv, healthy=healthy)
+
+    async def _poll_posted(self, lost: StreamLost) -> str:
+        """Poll the conversation whose stream failed for the reply to the question already posted there"""
+        # A separate view so concurrent callers on that conversation don't move each other's watermark
+        conv = Conversation(lost.conv.id, lost.conv.token, expires_at=lost.conv.expires_at)
+        conv.watermark = lost.since
+
+        session = await self.http.get(self.name)
+        return await poll_reply(
+            session, self.url, conv, lost.activity_id, self.latency,
+            timeout=remaining_or(self.poll_timeout), name=self.name
+        )
+
+    async def start(self):
+        """Startup hook: fetch the shared token (if any) and warm the active transport's pool"""
+        if self.tokens.scope == "shared":
+            try:
+                await self.tokens.get()
+            except Exception as e:
+                print(f"[WARNING] Could not prefetch {self.name.upper()} token: {e}")
+                return
+        await self.stream_pool.start()
+        await self.poll_pool.start()
+
+    async def close(self):
+        """Shutdown hook"""
+        await self.stream_pool.close()
+        await self.poll_pool.close()
+        await self.tokens.close()
@@ -0,0 +1,96 @@
+import os
+import asyncio
+from typing import TYPE_CHECKING, Dict, Optional
+from utils.deadline import DeadlineExceeded, remaining_or
+from utils.config import load_config
+
+if TYPE_CHECKING:
+    import aiohttp
+
+load_config()
+
+HTTP_POOL_LIMIT = int(os.environ.get("HTTP_POOL_LIMIT", "100"))
+HTTP_POOL_LIMIT_PER_HOST = int(os.environ.get("HTTP_POOL_LIMIT_PER_HOST", "20"))
+HTTP_KEEPALIVE_TIMEOUT = float(os.environ.get("HTTP_KEEPALIVE_TIMEOUT", "60"))
+HTTP_DNS_CACHE_TTL = int(os.environ.get("HTTP_DNS_CACHE_TTL", "300"))
+
+def client_timeout(seconds: Optional[float]) -> "aiohttp.ClientTimeout":
+    """ClientTimeout for one request, capped by the current request deadline"""
+    import aiohttp
+
+    limit = remaining_or(seconds)
+    if limit is not None and limit <= 0:
+        raise DeadlineExceeded("deadline expired")
+    return aiohttp.ClientTimeout(total=limit)
+
+
+class SessionPool:
+    """
+    Long-lived aiohttp sessions shared by every backend tool.
+
+    Sessions are keyed by name (one per backend by default) so each keeps its
+    own keep-alive connector and per-host limit. Sessions are created lazily
+    inside the running loop; call `start()` to warm them up and `close()` on
+    shutdown.
+    """
+
+    def __init__(
+        self,
+        limit: int = HTTP_POOL_LIMIT,
+        limit_per_host: int = HTTP_POOL_LIMIT_PER_HOST,
+        keepalive_timeout: float = HTTP_KEEPALIVE_TIMEOUT,
+        dns_cache_ttl: int = HTTP_DNS_CACHE_TTL,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self._sessions: Dict[str, "aiohttp.ClientSession"] = {}
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _new_session(self) -> "aiohttp.ClientSession":
+        # Imported on first use so importing the agents stays cheap
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.dns_cache_ttl,
+        )
+        return aiohttp.ClientSession(connector=connector)
+
+    async def get(self, name: str = "default") -> "aiohttp.ClientSession":
+        """Return the shared session for `name`, creating it on first use"""
+        session = self._sessions.get(name)
+        if session is not None and not session.closed:
+            return session
+
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            session = self._sessions.get(name)
+            if session is None or session.closed:
+                session = self._new_session()
+                self._sessions[name] = session
+            return session
+
+    async def start(self, *names: str):
+        """Startup hook: open sessions ahead of the first request"""
+        for name in names or ("default",):
+            await self.get(name)
+
+    async def close(self):
+        """Shutdown hook: close every session and its pooled connections"""
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        for session in sessions:
+            if not session.closed:
+                await session.close()
+        # Give the connectors a tick to release SSL transports
+        await asyncio.sleep(0)
+        self._lock = None
+
+
+session_pool = SessionPool()
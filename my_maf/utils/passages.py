@@ -0,0 +1,79 @@
+import math
+from collections import Counter
+from typing import List, Sequence
+from utils.text import content_tokens, estimate_tokens
+
+def bm25_scores(query: Sequence[str], documents: Sequence[Sequence[str]], k1: float = 1.5, b: float = 0.75) -> List[float]:
+    """Okapi BM25 score of each tokenized document for the tokenized query, with IDF taken over `documents`"""
+    if not documents:
+        return []
+    avg_length = sum(len(doc) for doc in documents) / len(documents) or 1.0
+    df = Counter(token for doc in documents for token in set(doc))
+    idf = {
+        token: math.log(1 + (len(documents) - df[token] + 0.5) / (df[token] + 0.5))
+        for token in set(query) if token in df
+    }
+
+    scores = []
+    for doc in documents:
+        tf = Counter(doc)
+        norm = k1 * (1 - b + b * len(doc) / avg_length)
+        scores.append(sum(
+            weight * tf[token] * (k1 + 1) / (tf[token] + norm)
+            for token, weight in idf.items() if token in tf
+        ))
+    return scores
+
+
+def _overlap(a: set, b: set) -> float:
+    """Share of the smaller token set found in the other one"""
+    if not a or not b:
+        return 1.0 if a == b else 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+def select_passages(
+    query: str,
+    passages: Sequence[str],
+    budget: int = 1500,
+    max_passages: int = 5,
+    dedup_threshold: float = 0.8,
+) -> List[str]:
+    """
+    The passages most relevant to `query` that fit in `budget` tokens.
+
+    Passages are ranked by BM25 against the query; those sharing no word
+    with it are dropped unless none do, in which case the backend's order
+    is kept. Near-duplicates of a better-ranked passage are skipped
+    (`dedup_threshold` is the share of the shorter passage's words found in
+    the other), and the rest are packed best-first until `budget`
+    (estimated tokens) or `max_passages` is reached. A top passage larger
+    than the whole budget is cut to fit rather than dropped.
+    """
+    passages = [str(p).strip() for p in passages if p and str(p).strip()]
+    tokens = [content_tokens(p) for p in passages]
+    scores = bm25_scores(content_tokens(query), tokens)
+    order = sorted(range(len(passages)), key=lambda i: -scores[i])
+    if scores and scores[order[0]] > 0:
+        order = [i for i in order if scores[i] > 0]
+
+    selected: List[str] = []
+    kept: List[set] = []
+    used = 0
+    for i in order:
+        if len(selected) >= max_passages:
+            break
+        words = set(tokens[i])
+        if any(_overlap(words, other) >= dedup_threshold for other in kept):
+            continue
+
+        cost = estimate_tokens(passages[i])
+        if used + cost > budget:
+            if selected:
+                continue
+            passages[i] = passages[i][:budget * 4].rstrip() + "…"
+            cost = budget
+        selected.append(passages[i])
+        kept.append(words)
+        used += cost
+    return selected
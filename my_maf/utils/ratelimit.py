@@ -0,0 +1,51 @@
+import os
+import time
+import asyncio
+from typing import Optional
+
+class RateLimiter:
+    """
+    Token bucket limiting calls to `rate` per second with bursts of `burst`.
+
+    `acquire()` waits (without holding up other callers) until a token is
+    available; waiters are served in arrival order.
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(1, burst if burst is not None else int(rate) or 1)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    @classmethod
+    def from_env(cls, name: str) -> Optional["RateLimiter"]:
+        """
+        Configured from `<NAME>_RATE_LIMIT` (calls/sec) and `<NAME>_RATE_BURST`,
+        falling back to `RATE_LIMIT`/`RATE_BURST`; None (unlimited) when unset or 0
+        """
+        prefix = name.upper()
+        rate = float(os.environ.get(f"{prefix}_RATE_LIMIT", os.environ.get("RATE_LIMIT", "0")) or 0)
+        if rate <= 0:
+            return None
+        burst = os.environ.get(f"{prefix}_RATE_BURST", os.environ.get("RATE_BURST", ""))
+        return cls(rate, int(burst) if burst else None)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """Take one token, waiting for the bucket to refill if needed"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
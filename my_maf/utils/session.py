@@ -0,0 +1,101 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from utils.cache import TTLCache
+from utils.text import estimate_tokens
+
+# Session of the request being handled; DirectLine backends keep one bot conversation per session
+_session_id: ContextVar[Optional[str]] = ContextVar("session_id", default=None)
+
+@contextmanager
+def session_scope(session_id: Optional[str]):
+    token = _session_id.set(session_id)
+    try:
+        yield session_id
+    finally:
+        _session_id.reset(token)
+
+
+def current_session() -> Optional[str]:
+    """Session of the current request (None for stateless requests)"""
+    return _session_id.get()
+
+
+def with_history(history: str, message: str) -> str:
+    """LLM prompt for `message` preceded by the conversation so far"""
+    if not history:
+        return message
+    return f"Conversation so far:\n{history}\n\nCurrent message: {message}"
+
+
+class SessionStore:
+    """
+    Per-session conversation history for multi-turn chats.
+
+    Each session keeps compact turn records (question, answering agent and
+    an answer cut to `answer_chars`). Whenever the history outgrows
+    `history_tokens`, the oldest turns are folded into a one-line list of
+    earlier questions, itself capped at a quarter of the budget, so the
+    prompt prefix built from `history()` stays bounded however long the
+    chat runs.
+
+    Sessions live in a TTLCache: at most `max_sessions` are kept, the least
+    recently used are evicted first and a session idle for `idle_ttl`
+    seconds expires. With `path` they are also stored in SQLite and survive
+    restarts; without it they are kept in memory only.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 1024,
+        idle_ttl: float = 3600,
+        path: Optional[str] = None,
+        history_tokens: int = 1000,
+        answer_chars: int = 600,
+    ):
+        self.history_tokens = history_tokens
+        self.answer_chars = answer_chars
+        self._sessions = TTLCache(max_size=max_sessions, ttl=idle_ttl, path=path, table="sessions")
+
+    def get(self, session_id: str) -> dict:
+        """`{"earlier": [questions], "turns": [{"user", "agent", "answer"}]}` of a session"""
+        return self._sessions.get(session_id) or {"earlier": [], "turns": []}
+
+    def render(self, record: dict) -> str:
+        lines = []
+        if record["earlier"]:
+            lines.append("Earlier questions: " + "; ".join(record["earlier"]))
+        for turn in record["turns"]:
+            lines.append(f"User: {turn['user']}")
+            lines.append(f"Assistant ({turn['agent']}): {turn['answer']}")
+        return "\n".join(lines)
+
+    def history(self, session_id: Optional[str]) -> str:
+        """The session's conversation so far as prompt text ("" for new or no sessions)"""
+        if session_id is None:
+            return ""
+        return self.render(self.get(session_id))
+
+    def record(self, session_id: str, user: str, agent: str, answer: str):
+        """Append a turn, trimming the history back into the token budget"""
+        record = self.get(session_id)
+        answer = answer.strip()
+        if len(answer) > self.answer_chars:
+            answer = answer[:self.answer_chars].rstrip() + "…"
+        record["turns"].append({"user": user.strip(), "agent": agent, "answer": answer})
+
+        while record["turns"] and estimate_tokens(self.render(record)) > self.history_tokens:
+            record["earlier"].append(record["turns"].pop(0)["user"][:120])
+            while record["earlier"] and estimate_tokens("; ".join(record["earlier"])) > self.history_tokens // 4:
+                record["earlier"].pop(0)
+
+        self._sessions.set(session_id, record)
+
+    def clear(self, session_id: str):
+        self._sessions.invalidate(session_id)
+
+    def stats(self) -> dict:
+        return self._sessions.stats()
+
+    def close(self):
+        self._sessions.close()
@@ -0,0 +1,40 @@
+import os
+import time
+from typing import List, Tuple
+
+# Import this module first in an entry point so the profile covers its imports
+_START = time.perf_counter()
+
+class StartupProfile:
+    """
+    Wall-clock marks from process start-up to ready.
+
+    Entry points call `mark(phase)` after each start-up step (imports,
+    configuration, agent registry, ...); `report()` lists how long each
+    step took. Printed at start-up when STARTUP_PROFILE=true.
+    """
+
+    def __init__(self, start: float = _START):
+        self.start = start
+        self.marks: List[Tuple[str, float]] = []
+
+    def mark(self, phase: str):
+        self.marks.append((phase, time.perf_counter()))
+
+    @property
+    def total(self) -> float:
+        return (self.marks[-1][1] if self.marks else time.perf_counter()) - self.start
+
+    def report(self) -> str:
+        lines = [f"{'startup phase':<30} {'sec':>8} {'total':>8}"]
+        previous = self.start
+        for phase, at in self.marks:
+            lines.append(f"{phase:<30} {at - previous:>8.3f} {at - self.start:>8.3f}")
+            previous = at
+        return "\n".join(lines)
+
+
+startup = StartupProfile()
+
+def enabled() -> bool:
+    return os.environ.get("STARTUP_PROFILE", "false").lower() == "true"
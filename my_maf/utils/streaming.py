@@ -0,0 +1,46 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+Progress = Callable[[str], None]
+
+async def progressive(run: Callable[[Progress], Awaitable[str]]) -> AsyncIterator[str]:
+    """
+    Run `run(on_progress)` in the background and yield the answer as it grows
+
+    Every text `run` reports through `on_progress` is yielded as it arrives,
+    followed by its result: each item is the answer so far and the last one
+    is complete. Exceptions from `run` propagate; closing the generator
+    early cancels it.
+    """
+    updates: asyncio.Queue = asyncio.Queue()
+    task = asyncio.ensure_future(run(updates.put_nowait))
+    task.add_done_callback(lambda _: updates.put_nowait(None))
+    try:
+        while (text := await updates.get()) is not None:
+            yield text
+        yield task.result()
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+class Appender:
+    """
+    Turns "answer so far" snapshots into the chunks to append to what's shown
+
+    A snapshot that doesn't extend what was already sent (a bot rewording
+    its partial answer) produces no chunk; `text` is always the latest
+    snapshot, i.e. the answer to keep.
+    """
+
+    def __init__(self):
+        self.sent = ""
+        self.text = ""
+
+    def feed(self, snapshot: str) -> Optional[str]:
+        self.text = snapshot
+        if len(snapshot) > len(self.sent) and snapshot.startswith(self.sent):
+            chunk = snapshot[len(self.sent):]
+            self.sent = snapshot
+            return chunk
+        return None
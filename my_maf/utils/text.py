@@ -0,0 +1,49 @@
+import re
+from typing import List
+
+# Common Indonesian function words that don't change what a question is about
+STOPWORDS = {
+    "ada", "adalah", "agar", "akan", "aku", "anda", "apa", "apakah", "atau",
+    "bagaimana", "bahwa", "banyak", "beberapa", "berapa", "bisa", "boleh",
+    "dalam", "dan", "dari", "dengan", "di", "dia", "hal", "harus", "ini", "itu",
+    "jadi", "jelaskan", "jika", "juga", "kah", "kami", "kamu", "kan", "ke",
+    "kenapa", "kepada", "kita", "lah", "mana", "mengapa", "mohon", "nya",
+    "oleh", "pada", "para", "saja", "saya", "sebagai", "sebutkan", "secara",
+    "sedang", "sehingga", "siapa", "sudah", "tentang", "tersebut", "tidak",
+    "tolong", "untuk", "yaitu", "yang", "halo", "hai", "dong", "sih", "ya",
+}
+
+_TOKEN_RE = re.compile(r"[0-9a-z]+")
+_WORD_RE = re.compile(r"\w+")
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens"""
+    return _TOKEN_RE.findall(text.lower())
+
+def content_tokens(text: str) -> List[str]:
+    """Tokens with Indonesian stopwords removed"""
+    return [t for t in tokenize(text) if t not in STOPWORDS]
+
+def normalize_query(text: str) -> str:
+    """
+    Answer cache key form of a query: lowercase, no punctuation, single spaces
+
+    Deliberately keeps every word: dropping stopwords would map questions
+    that differ only in a negation or question word ("tidak", "berapa",
+    "mengapa", ...) to the same cached answer.
+    """
+    return " ".join(_WORD_RE.findall(text.lower()))
+
+def routing_key(text: str) -> str:
+    """
+    Routing cache key form of a query: its content tokens, single spaces
+
+    Unlike `normalize_query`, Indonesian stopwords (negations and question
+    words included) are dropped: they change the answer, not which agent
+    handles the question.
+    """
+    return " ".join(content_tokens(text))
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (~4 characters per token), for prompt budgets"""
+    return (len(text) + 3) // 4
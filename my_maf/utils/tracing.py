@@ -0,0 +1,190 @@
+import os
+import json
+import time
+import uuid
+import threading
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from utils.config import load_config
+
+load_config()
+
+TRACE_VERBOSE = os.environ.get("TRACE_VERBOSE", "true").lower() == "true"
+TRACE_EXPORT_PATH = os.environ.get("TRACE_EXPORT_PATH", "")
+TRACE_FORMAT = os.environ.get("TRACE_FORMAT", "jsonl")  # jsonl | otlp
+TRACE_HISTOGRAM_SIZE = int(os.environ.get("TRACE_HISTOGRAM_SIZE", "5000"))
+
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+class Span:
+    """One timed phase of a request"""
+
+    def __init__(self, name: str, attributes: dict, parent: Optional["Span"]):
+        self.name = name
+        self.attributes = attributes
+        self.request_id = _request_id.get() or (parent.request_id if parent else new_request_id())
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self.start_wall = time.time()
+        self.start = time.monotonic()
+        self.duration = 0.0
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        """Histogram key: phase name and the backend/agent it belongs to"""
+        return self.name, str(self.attributes.get("backend") or self.attributes.get("agent") or "-")
+
+    def to_dict(self) -> dict:
+        return {
+            "request_id": self.request_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start_wall,
+            "duration": self.duration,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+    def to_otlp(self) -> dict:
+        """OpenTelemetry (OTLP/JSON) span representation"""
+        start_ns = int(self.start_wall * 1e9)
+        return {
+            "traceId": self.request_id[:32].ljust(32, "0"),
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(start_ns + int(self.duration * 1e9)),
+            "attributes": [
+                {"key": k, "value": {"stringValue": str(v)}} for k, v in self.attributes.items()
+            ],
+            "status": {"code": 1 if self.status == "ok" else 2, "message": self.error or ""},
+        }
+
+
+class Histogram:
+    """Bounded sample of latencies with percentile lookups"""
+
+    def __init__(self, size: int = TRACE_HISTOGRAM_SIZE):
+        self.samples: deque = deque(maxlen=size)
+        self.count = 0
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(int(round(q / 100 * (len(ordered) - 1))), len(ordered) - 1)]
+
+
+class JsonlExporter:
+    """Appends finished spans to a local file, one JSON object per line"""
+
+    def __init__(self, path: str, fmt: str = TRACE_FORMAT):
+        self.path = path
+        self.fmt = fmt
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        record = span.to_otlp() if self.fmt == "otlp" else span.to_dict()
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class Tracer:
+    """
+    Spans on a monotonic clock, tagged with the current request id.
+
+    Finished spans feed per-(phase, backend) latency histograms and are
+    handed to every exporter; with `verbose` each one is also printed.
+    """
+
+    def __init__(self, verbose: bool = TRACE_VERBOSE, exporters: Optional[List] = None):
+        self.verbose = verbose
+        self.exporters = exporters or []
+        self.histograms: Dict[Tuple[str, str], Histogram] = defaultdict(Histogram)
+
+    @contextmanager
+    def request(self, request_id: Optional[str] = None):
+        """Tag everything inside with one request id"""
+        token = _request_id.set(request_id or new_request_id())
+        try:
+            yield _request_id.get()
+        finally:
+            _request_id.reset(token)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        span = Span(name, attributes, _current_span.get())
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.status = "error"
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration = time.monotonic() - span.start
+            _current_span.reset(token)
+            self._finish(span)
+
+    def _finish(self, span: Span):
+        self.histograms[span.key].record(span.duration)
+
+        if self.verbose:
+            phase, owner = span.key
+            status = "" if span.status == "ok" else f" | {span.error}"
+            label = phase if owner == "-" else f"{owner.upper()} - {phase}"
+            print(f"[TRACE {label}] {span.duration:.3f} sec{status}")
+
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception as e:
+                print(f"[WARNING] Trace export failed: {e}")
+
+    def summary(self) -> dict:
+        """p50/p95/p99 per phase and backend"""
+        return {
+            f"{phase}/{owner}": {
+                "count": h.count,
+                "p50": h.percentile(50),
+                "p95": h.percentile(95),
+                "p99": h.percentile(99),
+            }
+            for (phase, owner), h in sorted(self.histograms.items())
+        }
+
+    def report(self) -> str:
+        lines = [f"{'phase/backend':<40} {'count':>6} {'p50':>8} {'p95':>8} {'p99':>8}"]
+        for key, row in self.summary().items():
+            lines.append(
+                f"{key:<40} {row['count']:>6} {row['p50']:>8.3f} {row['p95']:>8.3f} {row['p99']:>8.3f}"
+            )
+        return "\n".join(lines)
+
+
+tracer = Tracer(exporters=[JsonlExporter(TRACE_EXPORT_PATH)] if TRACE_EXPORT_PATH else None)